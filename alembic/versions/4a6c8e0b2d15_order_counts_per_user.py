@@ -0,0 +1,88 @@
+"""order counts per user only
+
+Revision ID: 4a6c8e0b2d15
+Revises: 7e3b5a9c1f62
+Create Date: 2026-10-18 23:05:17.640913
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '4a6c8e0b2d15'
+down_revision = '7e3b5a9c1f62'
+branch_labels = None
+depends_on = None
+
+# Back to per-user rows only: every order write upserted the one all-users
+# row of its status and held it until commit, serializing all writers
+PER_USER_FUNCTION = """
+CREATE OR REPLACE FUNCTION order_counts_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT user_id, status, count(*) FROM new_rows
+        GROUP BY user_id, status ORDER BY user_id, status
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE order_counts c SET count = c.count - d.n
+        FROM (SELECT user_id, status, count(*) AS n FROM old_rows
+              GROUP BY user_id, status ORDER BY user_id, status) d
+        WHERE c.user_id = d.user_id AND c.status = d.status;
+    ELSE
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT user_id, status, sum(delta) FROM (
+            SELECT user_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT user_id, status, 1 FROM new_rows
+        ) d
+        GROUP BY user_id, status HAVING sum(delta) <> 0 ORDER BY user_id, status
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+ALL_USERS_FUNCTION = """
+CREATE OR REPLACE FUNCTION order_counts_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT COALESCE(user_id, 0), status, count(*) FROM new_rows
+        GROUP BY GROUPING SETS ((user_id, status), (status)) ORDER BY 1, 2
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE order_counts c SET count = c.count - d.n
+        FROM (SELECT COALESCE(user_id, 0) AS user_id, status, count(*) AS n FROM old_rows
+              GROUP BY GROUPING SETS ((user_id, status), (status)) ORDER BY 1, 2) d
+        WHERE c.user_id = d.user_id AND c.status = d.status;
+    ELSE
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT COALESCE(user_id, 0), status, sum(delta) FROM (
+            SELECT user_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT user_id, status, 1 FROM new_rows
+        ) d
+        GROUP BY GROUPING SETS ((user_id, status), (status)) HAVING sum(delta) <> 0 ORDER BY 1, 2
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute("LOCK TABLE orders IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(PER_USER_FUNCTION)
+    op.execute("DELETE FROM order_counts WHERE user_id = 0")
+
+
+def downgrade() -> None:
+    # No order may be written between the backfill and the function going live
+    op.execute("LOCK TABLE orders IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(ALL_USERS_FUNCTION)
+    op.execute(
+        "INSERT INTO order_counts (user_id, status, count)"
+        " SELECT 0, status, sum(count) FROM order_counts WHERE user_id <> 0 GROUP BY status"
+    )
@@ -0,0 +1,83 @@
+"""order counts
+
+Revision ID: 5b7e2c4d9a31
+Revises: 3f1a9c7b2d10
+Create Date: 2026-10-18 14:05:12.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5b7e2c4d9a31'
+down_revision = '3f1a9c7b2d10'
+branch_labels = None
+depends_on = None
+
+ORDER_COUNTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION order_counts_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT user_id, status, count(*) FROM new_rows
+        GROUP BY user_id, status ORDER BY user_id, status
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE order_counts c SET count = c.count - d.n
+        FROM (SELECT user_id, status, count(*) AS n FROM old_rows
+              GROUP BY user_id, status ORDER BY user_id, status) d
+        WHERE c.user_id = d.user_id AND c.status = d.status;
+    ELSE
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT user_id, status, sum(delta) FROM (
+            SELECT user_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT user_id, status, 1 FROM new_rows
+        ) d
+        GROUP BY user_id, status HAVING sum(delta) <> 0 ORDER BY user_id, status
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table('order_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM('PENDING', 'PAID', 'SHIPPED', 'CANCELED', name='order_status', create_type=False), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'status')
+    )
+    # No order may be written between the backfill and the triggers going live
+    op.execute("LOCK TABLE orders IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(ORDER_COUNTS_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER order_counts_insert AFTER INSERT ON orders"
+        " REFERENCING NEW TABLE AS new_rows"
+        " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER order_counts_update AFTER UPDATE ON orders"
+        " REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"
+        " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()"
+    )
+    op.execute(
+        "CREATE TRIGGER order_counts_delete AFTER DELETE ON orders"
+        " REFERENCING OLD TABLE AS old_rows"
+        " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()"
+    )
+    op.execute(
+        "INSERT INTO order_counts (user_id, status, count)"
+        " SELECT user_id, status, count(*) FROM orders GROUP BY user_id, status"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER order_counts_delete ON orders")
+    op.execute("DROP TRIGGER order_counts_update ON orders")
+    op.execute("DROP TRIGGER order_counts_insert ON orders")
+    op.execute("DROP FUNCTION order_counts_apply()")
+    op.drop_table('order_counts')
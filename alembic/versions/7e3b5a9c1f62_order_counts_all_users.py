@@ -0,0 +1,88 @@
+"""order counts of all users
+
+Revision ID: 7e3b5a9c1f62
+Revises: d2a9f7c31e84
+Create Date: 2026-10-18 21:10:44.208391
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '7e3b5a9c1f62'
+down_revision = 'd2a9f7c31e84'
+branch_labels = None
+depends_on = None
+
+# The (status) grouping set also keeps one row per status under user_id 0,
+# so a count over all users reads that row instead of every user's
+ORDER_COUNTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION order_counts_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT COALESCE(user_id, 0), status, count(*) FROM new_rows
+        GROUP BY GROUPING SETS ((user_id, status), (status)) ORDER BY 1, 2
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE order_counts c SET count = c.count - d.n
+        FROM (SELECT COALESCE(user_id, 0) AS user_id, status, count(*) AS n FROM old_rows
+              GROUP BY GROUPING SETS ((user_id, status), (status)) ORDER BY 1, 2) d
+        WHERE c.user_id = d.user_id AND c.status = d.status;
+    ELSE
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT COALESCE(user_id, 0), status, sum(delta) FROM (
+            SELECT user_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT user_id, status, 1 FROM new_rows
+        ) d
+        GROUP BY GROUPING SETS ((user_id, status), (status)) HAVING sum(delta) <> 0 ORDER BY 1, 2
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+PER_USER_FUNCTION = """
+CREATE OR REPLACE FUNCTION order_counts_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT user_id, status, count(*) FROM new_rows
+        GROUP BY user_id, status ORDER BY user_id, status
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE order_counts c SET count = c.count - d.n
+        FROM (SELECT user_id, status, count(*) AS n FROM old_rows
+              GROUP BY user_id, status ORDER BY user_id, status) d
+        WHERE c.user_id = d.user_id AND c.status = d.status;
+    ELSE
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT user_id, status, sum(delta) FROM (
+            SELECT user_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT user_id, status, 1 FROM new_rows
+        ) d
+        GROUP BY user_id, status HAVING sum(delta) <> 0 ORDER BY user_id, status
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    # No order may be written between the backfill and the new function going live
+    op.execute("LOCK TABLE orders IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(ORDER_COUNTS_FUNCTION)
+    op.execute(
+        "INSERT INTO order_counts (user_id, status, count)"
+        " SELECT 0, status, sum(count) FROM order_counts WHERE user_id <> 0 GROUP BY status"
+    )
+
+
+def downgrade() -> None:
+    op.execute("LOCK TABLE orders IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(PER_USER_FUNCTION)
+    op.execute("DELETE FROM order_counts WHERE user_id = 0")
@@ -0,0 +1,122 @@
+"""partition orders by month
+
+Revision ID: 8c4d1e6f2a57
+Revises: 5b7e2c4d9a31
+Create Date: 2026-10-18 16:40:27.913554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '8c4d1e6f2a57'
+down_revision = '5b7e2c4d9a31'
+branch_labels = None
+depends_on = None
+
+# One partition per UTC month from the oldest order up to three months
+# ahead; app.core.partitions keeps creating them from there
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    lower_bound timestamptz;
+    last_bound timestamptz;
+BEGIN
+    SET LOCAL TIME ZONE 'UTC';
+    SELECT date_trunc('month', COALESCE(min(created_at), now())) INTO lower_bound FROM orders_unpartitioned;
+    SELECT date_trunc('month', GREATEST(max(created_at), now() + interval '3 months')) INTO last_bound
+    FROM orders_unpartitioned;
+    WHILE lower_bound <= last_bound LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF orders FOR VALUES FROM (%L) TO (%L)',
+            to_char(lower_bound, '"orders_y"YYYY"m"MM'), lower_bound, lower_bound + interval '1 month'
+        );
+        lower_bound := lower_bound + interval '1 month';
+    END LOOP;
+END
+$$
+"""
+
+ORDER_COUNTS_TRIGGERS = [
+    "CREATE TRIGGER order_counts_insert AFTER INSERT ON orders"
+    " REFERENCING NEW TABLE AS new_rows"
+    " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()",
+    "CREATE TRIGGER order_counts_update AFTER UPDATE ON orders"
+    " REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"
+    " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()",
+    "CREATE TRIGGER order_counts_delete AFTER DELETE ON orders"
+    " REFERENCING OLD TABLE AS old_rows"
+    " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()",
+]
+
+ORDER_INDEXES = [
+    ('ix_order_status_created', ['status', 'created_at']),
+    ('ix_order_user_created', ['user_id', 'created_at']),
+    ('ix_orders_created_at', ['created_at']),
+    ('ix_orders_status', ['status']),
+]
+
+
+def _swap_out_orders() -> None:
+    """Rename orders out of the way, freeing its trigger, index and constraint names."""
+    # Writes wait until the copy is committed
+    op.execute("LOCK TABLE orders IN ACCESS EXCLUSIVE MODE")
+    for trigger in ('order_counts_insert', 'order_counts_update', 'order_counts_delete'):
+        op.execute(f"DROP TRIGGER {trigger} ON orders")
+    for name, _ in ORDER_INDEXES:
+        op.drop_index(name, table_name='orders')
+    op.rename_table('orders', 'orders_unpartitioned')
+    op.execute("ALTER TABLE orders_unpartitioned RENAME CONSTRAINT orders_pkey TO orders_unpartitioned_pkey")
+    op.execute(
+        "ALTER TABLE orders_unpartitioned"
+        " RENAME CONSTRAINT orders_user_id_fkey TO orders_unpartitioned_user_id_fkey"
+    )
+
+
+def _copy_back_orders() -> None:
+    """Fill the new orders from the old table, drop it and reinstall the triggers.
+
+    The copy runs before the triggers exist: order_counts already has these rows.
+    """
+    op.execute(
+        "INSERT INTO orders (id, user_id, items, total_price, status, created_at)"
+        " SELECT id, user_id, items, total_price, status, created_at FROM orders_unpartitioned"
+    )
+    op.drop_table('orders_unpartitioned')
+    for statement in ORDER_COUNTS_TRIGGERS:
+        op.execute(statement)
+
+
+def _create_orders(primary_key: sa.PrimaryKeyConstraint, **kw) -> None:
+    op.create_table('orders',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('items', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('total_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('status', postgresql.ENUM('PENDING', 'PAID', 'SHIPPED', 'CANCELED', name='order_status', create_type=False), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='orders_user_id_fkey'),
+    primary_key,
+    **kw
+    )
+    for name, columns in ORDER_INDEXES:
+        op.create_index(name, 'orders', columns, unique=False)
+
+
+def upgrade() -> None:
+    _swap_out_orders()
+    _create_orders(
+        sa.PrimaryKeyConstraint('id', 'created_at', name='orders_pkey'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+    op.execute("CREATE TABLE orders_default PARTITION OF orders DEFAULT")
+    _copy_back_orders()
+
+
+def downgrade() -> None:
+    # Partitions detached by the maintenance job are not brought back
+    _swap_out_orders()
+    _create_orders(sa.PrimaryKeyConstraint('id', name='orders_pkey'))
+    _copy_back_orders()
@@ -0,0 +1,62 @@
+"""structured order items
+
+Revision ID: d2a9f7c31e84
+Revises: 8c4d1e6f2a57
+Create Date: 2026-10-18 19:22:03.571904
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd2a9f7c31e84'
+down_revision = '8c4d1e6f2a57'
+branch_labels = None
+depends_on = None
+
+# Legacy items are strings like "item1,item2,item1": every distinct name
+# becomes a line with its number of occurrences. Their prices were never
+# recorded, so the lines get unit_price 0 and total_price stays as it was.
+# The empty object of the old column default becomes an empty list.
+ITEMS_TO_LINES = """
+UPDATE orders SET items = CASE
+    WHEN jsonb_typeof(items) = 'object' AND items = '{}'::jsonb THEN '[]'::jsonb
+    ELSE COALESCE((
+        SELECT jsonb_agg(
+            jsonb_build_object('sku', sku, 'qty', qty, 'unit_price', 0) ORDER BY first_seen
+        )
+        FROM (
+            SELECT left(btrim(token), 64) AS sku, count(*) AS qty, min(position) AS first_seen
+            FROM unnest(string_to_array(orders.items #>> '{}', ',')) WITH ORDINALITY AS t(token, position)
+            WHERE btrim(token) <> ''
+            GROUP BY left(btrim(token), 64)
+        ) lines
+    ), '[]'::jsonb)
+END
+WHERE jsonb_typeof(items) <> 'array'
+"""
+
+LINES_TO_ITEMS = """
+UPDATE orders SET items = to_jsonb(COALESCE((
+    SELECT string_agg(line->>'sku', ',')
+    FROM jsonb_array_elements(orders.items) AS line,
+         generate_series(1, (line->>'qty')::int)
+), ''))
+WHERE jsonb_typeof(items) = 'array'
+"""
+
+
+def upgrade() -> None:
+    op.execute(ITEMS_TO_LINES)
+    op.create_index(
+        'ix_order_items',
+        'orders',
+        ['items'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'items': 'jsonb_path_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_items', table_name='orders')
+    op.execute(LINES_TO_ITEMS)
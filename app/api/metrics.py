@@ -0,0 +1,30 @@
+"""Per-worker runtime metrics of caches and pools."""
+import os
+
+from fastapi import APIRouter, Depends, status
+
+from app.core.database import InstrumentedPool, engine, replicas
+from app.core.dependencies import get_current_user
+from app.services.jwt_services import password_executor, token_cache
+from app.services.order_service import order_l1
+from app.services.user_cache import user_cache
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(get_current_user)],
+    status_code=status.HTTP_200_OK,
+)
+async def get_metrics() -> dict:
+    """Counters of the worker process that served this request"""
+    return {
+        "pid": os.getpid(),
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.local.stats(),
+        "password_hasher": password_executor.stats(),
+        "order_l1": order_l1.stats(),
+        "db_pool": pool.stats() if isinstance(pool := engine.sync_engine.pool, InstrumentedPool) else {},
+        "replicas": replicas.stats(),
+    }
@@ -1,13 +1,38 @@
 """Orders API endpoints for create and show order by ID and all orders for certain user."""
 import uuid
+from datetime import timedelta
+from decimal import Decimal
 
-from fastapi import APIRouter, Depends, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import AwareDatetime
 
-from app.core.dependencies import CurrentUser, get_order_repository
-from app.schemas.order_schemas import OrderCreate, OrderResponse
+from app.core.config import settings
+from app.core.database import read_session_factory
+from app.core.dependencies import (
+    CurrentUser,
+    get_order_repository,
+    get_outbox_repository,
+    get_read_order_repository,
+)
+from app.repositories.outbox import OutboxRepository
+from app.schemas.order_schemas import (
+    ExportFormat,
+    OrderBatchCreate,
+    OrderBatchResponse,
+    OrderCountResponse,
+    OrderCreate,
+    OrderLookup,
+    OrderPage,
+    OrderResponse,
+    OrderSearch,
+    OrderStatus,
+)
+from app.services.export_service import OrderExportService
 from app.services.order_service import OrderService
 from app.utils.limiter import limiter
+from app.utils.responses import ModelResponse
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
@@ -15,9 +40,29 @@ router = APIRouter(prefix="/orders", tags=["orders"])
 
 def get_order_service(
     order_repo=Depends(get_order_repository),
+    outbox_repo=Depends(get_outbox_repository),
 ) -> OrderService:
     """Create dependicy from order_repository"""
-    return OrderService(order_repo)
+    return OrderService(order_repo, outbox_repo)
+
+
+def get_read_order_service(
+    order_repo=Depends(get_read_order_repository),
+    fill_sessions=Depends(read_session_factory),
+) -> OrderService:
+    """Order service for read-only routes; its sessions may be on a replica"""
+    return OrderService(order_repo, OutboxRepository(order_repo.session), fill_sessions=fill_sessions)
+
+
+async def get_export_service(request: Request) -> OrderExportService:
+    """Create export service; it opens its own DB session for streaming,
+    chosen like the sessions of the other read routes"""
+    return OrderExportService(session_factory=await read_session_factory(request))
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
 
 
 @router.post(
@@ -32,13 +77,141 @@ async def create_order(
     data: OrderCreate,
     user: CurrentUser,
     service: OrderService = Depends(get_order_service),
-) -> OrderResponse:
+) -> ModelResponse:
     """Create order"""
     order = await service.create_order(
         data=data,
         user_id=user.user_id,
     )
-    return order
+    return ModelResponse(order, status_code=status.HTTP_201_CREATED)
+
+
+@router.post(
+    "/batch",
+    dependencies=[Depends(oauth2_scheme)],
+    response_model=OrderBatchResponse,
+    status_code=status.HTTP_201_CREATED
+)
+@limiter.limit("600/minute")
+async def create_orders(
+    request: Request,
+    data: OrderBatchCreate,
+    user: CurrentUser,
+    service: OrderService = Depends(get_order_service),
+) -> ModelResponse:
+    """Create many orders at once, with a result per submitted item"""
+    result = await service.create_orders(
+        data=data.orders,
+        user_id=user.user_id,
+    )
+    return ModelResponse(result, status_code=status.HTTP_201_CREATED)
+
+
+@router.get(
+    "/export",
+    dependencies=[Depends(oauth2_scheme)],
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK
+)
+async def export_orders(
+    user: CurrentUser,
+    format: ExportFormat = ExportFormat.NDJSON,
+    user_id: int | None = None,
+    created_from: AwareDatetime | None = None,
+    created_to: AwareDatetime | None = None,
+    service: OrderExportService = Depends(get_export_service),
+) -> StreamingResponse:
+    """Stream orders of a user and/or a created_at range as NDJSON or CSV"""
+    if user_id is None and created_from is None and created_to is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Specify user_id or a created_from/created_to range",
+        )
+
+    body = service.stream(
+        format,
+        user_id=user_id,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format.value}"'},
+    )
+
+
+@router.get(
+    "/counts",
+    dependencies=[Depends(oauth2_scheme)],
+    response_model=OrderCountResponse,
+    status_code=status.HTTP_200_OK
+)
+async def count_orders(
+    user: CurrentUser,
+    user_id: int | None = None,
+    order_status: OrderStatus | None = Query(None, alias="status"),
+    exact: bool = True,
+    service: OrderService = Depends(get_read_order_service),
+) -> ModelResponse:
+    """Count orders by user and/or status; exact=false returns a planner estimate"""
+    result = await service.count_orders(user_id=user_id, status=order_status, exact=exact)
+    return ModelResponse(result)
+
+
+@router.get(
+    "/search",
+    dependencies=[Depends(oauth2_scheme)],
+    response_model=OrderPage,
+    status_code=status.HTTP_200_OK
+)
+async def search_orders(
+    user: CurrentUser,
+    statuses: list[OrderStatus] = Query([], alias="status", description="Repeatable"),
+    user_id: int | None = None,
+    created_from: AwareDatetime | None = None,
+    created_to: AwareDatetime | None = None,
+    older_than: timedelta | None = Query(None, description="Seconds or ISO 8601 duration"),
+    price_min: Decimal | None = Query(None, ge=0, max_digits=10, decimal_places=2),
+    price_max: Decimal | None = Query(None, ge=0, max_digits=10, decimal_places=2),
+    sku: str | None = Query(None, min_length=1, max_length=64),
+    limit: int = Query(settings.orders_page_size, ge=1, le=settings.orders_page_size_max),
+    cursor: str | None = None,
+    service: OrderService = Depends(get_read_order_service),
+) -> ModelResponse:
+    """Search orders by status, created_at range, age, price range, user and SKU, newest first"""
+    search = OrderSearch(
+        statuses=statuses,
+        user_id=user_id,
+        created_from=created_from,
+        created_to=created_to,
+        older_than=older_than,
+        price_min=price_min,
+        price_max=price_max,
+        sku=sku,
+    )
+    result = await service.search_orders(search, limit=limit, cursor=cursor)
+    return ModelResponse(result)
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(oauth2_scheme)],
+    response_model=list[OrderLookup],
+    status_code=status.HTTP_200_OK
+)
+async def get_orders(
+    user: CurrentUser,
+    ids: list[str] = Query(..., description="Order ids, repeated or comma-separated"),
+    service: OrderService = Depends(get_read_order_service),
+) -> ModelResponse:
+    """Get many orders by id, in request order, with not-found markers"""
+    try:
+        order_ids = [uuid.UUID(value) for param in ids for value in param.split(",") if value]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be UUIDs") from None
+    result = await service.get_orders(ids=order_ids)
+    return ModelResponse(result)
 
 
 @router.get(
@@ -50,29 +223,32 @@ async def create_order(
 async def get_order(
     order_id: uuid.UUID,
     user: CurrentUser,
-    service: OrderService = Depends(get_order_service),
-) -> OrderResponse:
+    service: OrderService = Depends(get_read_order_service),
+) -> ModelResponse:
     """Get order by id"""
     order = await service.get_order(order_id=order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return ModelResponse(order)
 
 
 @router.get(
     "/user/{user_id}",
     dependencies=[Depends(oauth2_scheme)],
-    response_model=list[OrderResponse],
+    response_model=OrderPage,
     status_code=status.HTTP_200_OK
 )
 async def get_order_user(
     user_id: int,
     user: CurrentUser,
-    service: OrderService = Depends(get_order_service),
-) -> list[OrderResponse]:
-    """Get order by user_id"""
-    result = await service.get_order_user(user_id=user_id)
-    return result
+    limit: int = Query(settings.orders_page_size, ge=1, le=settings.orders_page_size_max),
+    cursor: str | None = None,
+    service: OrderService = Depends(get_read_order_service),
+) -> ModelResponse:
+    """Get a page of orders by user_id, newest first"""
+    result = await service.get_order_user(user_id=user_id, limit=limit, cursor=cursor)
+    headers = {"X-Total-Count": str(result.total)} if result.total is not None else None
+    return ModelResponse(result, headers=headers)
 
 
 @router.patch(
@@ -82,16 +258,16 @@ async def get_order_user(
     status_code=status.HTTP_200_OK
 )
 @limiter.limit("600/minute")
-async def get_order_user(
+async def patch_order(
     request: Request,
     data: OrderCreate,
     order_id: uuid.UUID,
     user: CurrentUser,
     service: OrderService = Depends(get_order_service),
-) -> OrderResponse:
+) -> ModelResponse:
     """Update order"""
     order = await service.patch_order(data=data, order_id=order_id)
-    return order
+    return ModelResponse(order)
 
 
 
@@ -15,12 +15,37 @@ class Settings(BaseSettings):
     database_url: str = "..."
     POSTGRES_USER: str = "..."
     POSTGRES_PASSWORD: str = "..."
+    # "direct" caches prepared statements per connection; "pgbouncer" disables
+    # the cache and names statements uniquely for transaction-mode poolers
+    db_connection_mode: str = "direct"
+    db_statement_cache_size: int = 500
+    # Connections this deployment may open, split evenly across the
+    # WEB_CONCURRENCY worker processes; keep it below max_connections
+    db_connection_budget: int = 200
+    web_concurrency: int = 1
+    db_pool_timeout: float = 10.0
+    # Read replicas, comma-separated URLs; empty keeps every query on the primary
+    database_replica_urls: str = ""
+    replica_max_lag_seconds: float = 5.0
+    replica_lag_check_interval: float = 2.0
+    # After a write the same client reads from the primary for this long
+    read_your_writes_seconds: float = 5.0
 
     # JWT
     secret_key: str = "..."
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
+    token_cache_size: int = 50000
+
+    # bcrypt runs on a bounded thread pool; beyond the queue requests get 503
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+
+    # Authenticated user cache; user_cache_redis_ttl=0 keeps it process-local
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 60.0
+    user_cache_redis_ttl: int = 0
 
     # API
     api_prefix: str = "/api"
@@ -35,6 +60,75 @@ class Settings(BaseSettings):
     minute_max_limit: str = "1200/minute"
     storage_uri: str = "redis://redis:6379/1"
 
+    # Orders pagination
+    orders_page_size: int = 50
+    orders_page_size_max: int = 200
+
+    # Orders cache: Redis TTL and the per-worker L1 in front of it
+    order_cache_ttl: int = 300
+    order_l1_size: int = 10000
+    order_l1_ttl: float = 30.0
+    # Cross-worker fill lock on a miss (0 disables) and early refresh strength
+    order_cache_lock_ms: int = 0
+    order_cache_xfetch_beta: float = 1.0
+    # Pages of a user's order list, invalidated by bumping a per-user version
+    order_list_cache_ttl: int = 60
+    # Encoding of cached orders: json, or msgpack for about half the memory
+    order_cache_codec: str = "json"
+
+    # GET /orders?ids=...
+    orders_multi_get_max: int = 200
+
+    # Orders batch create
+    orders_batch_max: int = 500
+
+    # Kafka producer
+    kafka_bootstrap_servers: str = "kafka:9092"
+    kafka_acks: str = "all"
+    kafka_linger_ms: int = 5
+    kafka_max_batch_size: int = 65536
+    kafka_compression_type: str | None = None  # gzip, snappy, lz4, zstd
+
+    # Kafka consumer
+    kafka_consumer_mode: str = "batch"  # batch or single
+    kafka_consumer_batch_size: int = 500
+    kafka_consumer_flush_interval: float = 1.0
+    kafka_dead_letter_topic: str = "orders.dlq"
+
+    # Order processing engine
+    order_processing_concurrency: int = 1000
+    order_processing_max_pending: int = 5000
+    # Failed orders are retried with doubling backoff, then dead-lettered
+    order_processing_retries: int = 3
+    order_processing_retry_backoff: float = 1.0
+    order_processing_retry_backoff_max: float = 60.0
+    order_processing_seconds: float = 10.0
+    order_processing_progress_every: int = 1000
+
+    # Order events outbox relay
+    outbox_batch_size: int = 500
+    outbox_poll_interval: float = 0.5
+
+    # Orders partitions: one per month, created this many months ahead.
+    # Months older than the retention are detached (dropped only with
+    # drop_expired); 0 keeps every month. Lookups by id alone (GET/PATCH
+    # /orders/{id}, the processor's status changes) can't prune on
+    # created_at and probe one index per attached partition, so their cost
+    # grows with the retention
+    orders_partition_months_ahead: int = 3
+    orders_retention_months: int = 24
+    orders_partition_drop_expired: bool = False
+    orders_partition_check_interval: float = 3600.0
+
+    # Orders export
+    export_fetch_size: int = 2000
+    export_chunk_rows: int = 500
+
+    @property
+    def replica_urls_list(self) -> list[str]:
+        """Parse replica URLs from comma-separated string."""
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
     @property
     def cors_origins_list(self) -> list[str]:
         """Parse CORS origins from comma-separated string."""
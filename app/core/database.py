@@ -1,19 +1,119 @@
-from collections.abc import AsyncGenerator
+import time
+import uuid
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import declarative_base
+from fastapi import Depends, Request
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import ORMExecuteState, Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
+from app.core.replicas import ReplicaRouter, client_wrote_recently, mark_client_write
+
+
+def engine_connect_args(mode: str, statement_cache_size: int) -> dict[str, Any]:
+    """asyncpg connect args for a direct connection or one through PgBouncer.
+
+    Behind a transaction-mode pooler consecutive statements may land on
+    different server connections, so cached prepared statements and
+    asyncpg's numbered statement names would collide.
+    """
+    if mode == "direct":
+        return {"prepared_statement_cache_size": statement_cache_size}
+    if mode == "pgbouncer":
+        return {
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    raise ValueError(f"Unknown db_connection_mode {mode!r}")
+
+
+def pool_budget(connection_budget: int, workers: int) -> tuple[int, int]:
+    """Split a connection budget into (pool_size, max_overflow) per worker.
+
+    Half of a worker's share stays open, the rest is only opened in
+    spikes, so all workers together never exceed the budget.
+    """
+    per_worker = connection_budget // workers
+    if per_worker < 1:
+        raise ValueError(
+            f"db_connection_budget {connection_budget} is less than one per worker ({workers})"
+        )
+    pool_size = max(1, per_worker // 2)
+    return pool_size, per_worker - pool_size
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that also counts checkouts, time waited for them and timeouts.
+
+    The wait includes opening a new connection when the pool overflows.
+    """
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def stats(self) -> dict[str, Any]:
+        """Current occupancy and cumulative checkout counters."""
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": max(0, self.overflow()),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_seconds / self.checkouts * 1000, 3)
+            if self.checkouts else 0.0,
+            "wait_max_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,
-    future=True,
-    pool_size=50,
-    max_overflow=150,
-    pool_timeout=10,
-    pool_recycle=300,
-    connect_args={"prepared_statement_cache_size": 0},
+def make_engine(url: str) -> AsyncEngine:
+    """Engine with the pool sized from the connection budget."""
+    pool_size, max_overflow = pool_budget(settings.db_connection_budget, settings.web_concurrency)
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=InstrumentedPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=300,
+        connect_args=engine_connect_args(
+            settings.db_connection_mode, settings.db_statement_cache_size
+        ),
+    )
+
+
+engine = make_engine(settings.database_url)
+
+replicas = ReplicaRouter(
+    [make_engine(url) for url in settings.replica_urls_list],
+    max_lag=settings.replica_max_lag_seconds,
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -26,7 +126,28 @@ AsyncSessionLocal = async_sessionmaker(
 
 Base = declarative_base()
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement_writes(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush_writes(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[Any]]) -> None:
+    """Have get_db await callback once session committed; dropped on rollback."""
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+async def run_after_commit(session: AsyncSession) -> None:
+    for callback in session.info.pop("after_commit", []):
+        await callback()
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """Dependency for providing an asynchronous
     database session with automatic cleanup."""
     async with AsyncSessionLocal() as session:
@@ -38,3 +159,26 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+    await run_after_commit(session)
+    if replicas and session.info.get("wrote"):
+        await mark_client_write(request)
+
+
+async def read_session_factory(request: Request) -> async_sessionmaker[AsyncSession]:
+    """A fresh replica's session factory, the primary's if the client wrote
+    within read_your_writes_seconds or no replica is fresh enough."""
+    if replicas and not await client_wrote_recently(request):
+        return replicas.pick() or AsyncSessionLocal
+    return AsyncSessionLocal
+
+
+async def get_read_db(
+    factory: async_sessionmaker[AsyncSession] = Depends(read_session_factory),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes.
+
+    Uses a replica unless the client wrote within read_your_writes_seconds
+    or no replica is fresh enough; the primary serves those reads.
+    """
+    async with factory() as session:
+        yield session
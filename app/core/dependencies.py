@@ -1,19 +1,20 @@
 """Dependencies for FastAPI: services, repositories, and authentication."""
 from typing import Annotated
 
-import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.repositories.order import OrderRepository
+from app.repositories.outbox import OutboxRepository
 from app.repositories.user import UserRepository
-from app.schemas.auth_schemas import TokenPayload, UserContext
+from app.schemas.auth_schemas import UserContext
 from app.services.auth_service import AuthService
 from app.services.jwt_services import JWTService
+from app.services.user_cache import user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/auth/token")
 
@@ -39,33 +40,48 @@ async def get_order_repository(db: AsyncSession = Depends(get_db)) -> OrderRepos
     """Get order repository instance."""
     return OrderRepository(db)
 
+async def get_read_order_repository(db: AsyncSession = Depends(get_read_db)) -> OrderRepository:
+    """Get order repository instance for read-only routes (replica when fresh)."""
+    return OrderRepository(db)
+
+async def get_outbox_repository(db: AsyncSession = Depends(get_db)) -> OutboxRepository:
+    """Get outbox repository instance sharing the request session."""
+    return OutboxRepository(db)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     user_repo: UserRepository = Depends(get_user_repository),
+    jwt_service: JWTService = Depends(get_jwt_service),
 ) -> UserContext:
-    """Decode JWT and fetch user to ensure authorization."""
+    """Decode JWT and fetch user (cached) to ensure authorization."""
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        token_data = TokenPayload(**payload)
+        token_data = jwt_service.decode_token(token)
     except InvalidTokenError:
         raise credentials_exception
 
     if token_data.type != "access":
         raise credentials_exception
 
-    user = await user_repo.get_by_id(int(token_data.sub))
+    user_id = int(token_data.sub)
+    if cached := await user_cache.get(user_id):
+        return cached
+
+    user = await user_repo.get_by_id(user_id)
     if not user:
         raise credentials_exception
 
-    return UserContext(
+    res = UserContext(
         user_id=user.id,
         email=user.email,
     )
+    await user_cache.set(res)
+
+    return res
 
 
 # Annotated dependency для текущего пользователя
@@ -0,0 +1,168 @@
+"""Monthly range partitions of the orders table.
+
+Each calendar month (UTC) of created_at gets its own partition named
+orders_yYYYYmMM. Rows outside every month land in orders_default, which
+stays empty as long as partitions are created ahead of time.
+
+    python -m app.core.partitions
+
+keeps months_ahead future partitions in place and, with a retention set,
+detaches (optionally drops) the months that fell out of it.
+"""
+import asyncio
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import settings
+from app.core.database import engine
+from app.utils.logs import log
+
+PARENT = "orders"
+DEFAULT_PARTITION = "orders_default"
+_NAME = re.compile(r"^orders_y(\d{4})m(\d{2})$")
+# Serializes maintenance runs across processes
+_LOCK_ID = 0x6F72646572  # "order"
+
+
+def month_start(moment: datetime) -> datetime:
+    """First instant of the UTC month containing moment."""
+    moment = moment.astimezone(timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> datetime | None:
+    """Month a partition holds, None for names not made by partition_name."""
+    match = _NAME.match(name)
+    if match is None:
+        return None
+    return datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+
+
+def create_partition_sql(month: datetime) -> str:
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT}"
+        f" FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    )
+
+
+async def _lock(conn: AsyncConnection) -> None:
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _LOCK_ID})
+
+
+async def list_partitions(conn: AsyncConnection) -> list[str]:
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+            " WHERE i.inhparent = CAST(:parent AS regclass) ORDER BY c.relname"
+        ),
+        {"parent": PARENT},
+    )
+    return list(result.scalars())
+
+
+async def ensure_partitions(
+    conn: AsyncConnection, months_ahead: int, now: datetime | None = None
+) -> list[str]:
+    """Create the current month's partition and months_ahead after it.
+
+    A month that already has rows in orders_default cannot get its own
+    partition; it is logged and skipped until those rows are moved.
+    """
+    await _lock(conn)
+    existing = set(await list_partitions(conn))
+    current = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        stranded = await conn.scalar(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION}"
+                " WHERE created_at >= :lower AND created_at < :upper)"
+            ),
+            {"lower": month, "upper": add_months(month, 1)},
+        )
+        if stranded:
+            log.error(f"ERROR: partition {name} skipped, {DEFAULT_PARTITION} has rows for it")
+            continue
+        await conn.execute(text(create_partition_sql(month)))
+        created.append(name)
+    return created
+
+
+async def expire_partitions(
+    conn: AsyncConnection, retention_months: int, drop: bool, now: datetime | None = None
+) -> list[str]:
+    """Detach the partitions of months older than retention_months.
+
+    Detaching does not fire the order_counts triggers, so the expired
+    rows are taken out of the counters first. Detached tables are kept
+    for archiving unless drop is set.
+    """
+    if retention_months <= 0:
+        return []
+    await _lock(conn)
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+    expired = []
+    for name in await list_partitions(conn):
+        month = partition_month(name)
+        if month is None or month >= cutoff:
+            continue
+        await conn.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+        await conn.execute(
+            text(
+                "UPDATE order_counts c SET count = c.count - d.n"
+                f" FROM (SELECT user_id, status, count(*) AS n FROM {name}"
+                " GROUP BY user_id, status) d"
+                " WHERE c.user_id = d.user_id AND c.status = d.status"
+            )
+        )
+        await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        if drop:
+            await conn.execute(text(f"DROP TABLE {name}"))
+        expired.append(name)
+    return expired
+
+
+async def maintain(engine: AsyncEngine) -> None:
+    """One maintenance pass, each step in its own transaction."""
+    async with engine.begin() as conn:
+        created = await ensure_partitions(conn, settings.orders_partition_months_ahead)
+    async with engine.begin() as conn:
+        expired = await expire_partitions(
+            conn, settings.orders_retention_months, settings.orders_partition_drop_expired
+        )
+    if created or expired:
+        log.info(f"Order partitions created {created} expired {expired}")
+
+
+async def run_maintenance() -> None:
+    """Maintain the partitions every orders_partition_check_interval seconds."""
+    try:
+        while True:
+            try:
+                await maintain(engine)
+            except Exception as ex:
+                log.error(f"ERROR: partition maintenance failed ex {ex}")
+            await asyncio.sleep(settings.orders_partition_check_interval)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    log.debug("Starting partition maintenance ...")
+    asyncio.run(run_maintenance())
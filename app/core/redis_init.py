@@ -1,3 +1,5 @@
 from redis import asyncio as aioredis
 
 rdb = aioredis.Redis.from_url("redis://redis:6379/0", decode_responses=True)
+# Same server, raw bytes in and out for the binary cache codecs
+cache_rdb = aioredis.Redis.from_url("redis://redis:6379/0")
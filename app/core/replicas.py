@@ -0,0 +1,109 @@
+"""Read replicas: round-robin routing with lag-aware fallback to the primary."""
+import asyncio
+import hashlib
+import itertools
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.redis_init import rdb
+from app.utils.logs import log
+
+# Seconds the replica is behind; 0 when it has replayed all it received,
+# so an idle primary does not make a caught-up replica look stale
+REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()"
+    " THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+class ReplicaRouter:
+    """Hands out session factories of replicas whose lag is within `max_lag`.
+
+    Lag is unknown until the first check, so a replica only takes reads
+    once `check_lag` has seen it healthy.
+    """
+    def __init__(self, engines: list[AsyncEngine], max_lag: float) -> None:
+        self.engines = engines
+        self.max_lag = max_lag
+        self.sessionmakers = [
+            async_sessionmaker(
+                engine,
+                class_=AsyncSession,
+                expire_on_commit=False,
+                autoflush=False,
+                info={"replica": True},
+            )
+            for engine in engines
+        ]
+        self.lags: list[float | None] = [None] * len(engines)
+        self._turn = itertools.count()
+        self.fallbacks = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self) -> async_sessionmaker[AsyncSession] | None:
+        """Next fresh replica in round-robin order, None if none is fresh.
+
+        Only a miss with replicas configured counts as a fallback.
+        """
+        if not self.engines:
+            return None
+        fresh = [
+            maker
+            for maker, lag in zip(self.sessionmakers, self.lags, strict=True)
+            if lag is not None and lag <= self.max_lag
+        ]
+        if not fresh:
+            self.fallbacks += 1
+            return None
+        return fresh[next(self._turn) % len(fresh)]
+
+    async def check_lag(self, timeout: float) -> None:
+        """Measure every replica; one that fails or times out is taken out."""
+        for index, engine in enumerate(self.engines):
+            try:
+                async with asyncio.timeout(timeout), engine.connect() as conn:
+                    self.lags[index] = float(await conn.scalar(REPLICA_LAG_SQL))
+            except Exception as ex:
+                log.error(f"ERROR: replica {index} lag check failed ex {ex!r}")
+                self.lags[index] = None
+
+    async def monitor(self, interval: float) -> None:
+        """Keep the lags current until cancelled."""
+        while True:
+            await self.check_lag(timeout=interval)
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+    def stats(self) -> dict:
+        """Last measured lag per replica and reads sent to the primary instead."""
+        return {"lags": self.lags, "fallbacks": self.fallbacks}
+
+
+def _client_key(request: Request) -> str | None:
+    """Clients are told apart by their bearer token."""
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return f"ryw:{hashlib.sha256(authorization.encode()).hexdigest()[:32]}"
+
+
+async def mark_client_write(request: Request) -> None:
+    """Send this client's reads to the primary for read_your_writes_seconds."""
+    if key := _client_key(request):
+        await rdb.set(key, 1, px=int(settings.read_your_writes_seconds * 1000))
+
+
+async def client_wrote_recently(request: Request) -> bool:
+    key = _client_key(request)
+    return key is not None and bool(await rdb.exists(key))
@@ -1,22 +1,46 @@
 """Kafka consumer service for order processing."""
 import json
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from queue import Empty, SimpleQueue
 
-from confluent_kafka import Consumer, KafkaError
+from confluent_kafka import Consumer, KafkaError, Message, TopicPartition
 
-from app.tasks import process_order_task
+from app.core.config import settings
+from app.services.order_processor import OrderProcessor
 from app.utils.logs import log
 
-consumer = Consumer({
-    'bootstrap.servers': 'kafka:9092',
-    'group.id': 'order-processing-group',
-    'auto.offset.reset': 'earliest',
-    'enable.auto.commit': False
-})
+processor = OrderProcessor()
 
-consumer.subscribe(['orders'])
 
-def run_consumer():
-    """Continuously poll Kafka messages and dispatch 'new_order' events to Celery."""
+def create_consumer(on_revoke: Callable | None = None) -> Consumer:
+    """Create a consumer subscribed to the orders topic with manual commits."""
+    consumer = Consumer({
+        'bootstrap.servers': settings.kafka_bootstrap_servers,
+        'group.id': 'order-processing-group',
+        'auto.offset.reset': 'earliest',
+        'enable.auto.commit': False
+    })
+    if on_revoke is None:
+        consumer.subscribe(['orders'])
+    else:
+        consumer.subscribe(['orders'], on_revoke=on_revoke)
+    return consumer
+
+
+def handle_message(msg: Message) -> Future | None:
+    """Dispatch a 'new_order' event to the order processor."""
+    data = json.loads(msg.value().decode('utf-8'))
+    log.debug(f"ConsumerData: {data}")
+    if data.get('event_type') == 'new_order':
+        log.debug(f"if event_type == new_order ConsumerData: {data}")
+        return processor.submit(data['data'])
+    return None
+
+
+def run_consumer(consumer: Consumer):
+    """Continuously poll Kafka messages one by one, committing each synchronously."""
     while True:
         msg = consumer.poll(1.0)
         if msg is None:
@@ -28,15 +52,156 @@ def run_consumer():
             continue
 
         try:
-            data = json.loads(msg.value().decode('utf-8'))
-            log.debug(f"ConsumerData: {data}")
-            if data.get('event_type') == 'new_order':
-                log.debug(f"if event_type == new_order ConsumerData: {data}")
-                process_order_task.delay(data['data'])
-                consumer.commit(msg)
+            future = handle_message(msg)
         except Exception as e:
             log.debug(f"ErrorProcessing_message: {e}")
+            future = processor.submit_dead_letter(msg.value().decode('utf-8', 'replace'), str(e))
+        if future is not None:
+            future.result()
+        consumer.commit(msg)
+
+
+class PartitionOffsets:
+    """Offsets dispatched from one partition, in order, and which of them are done."""
+    def __init__(self) -> None:
+        self._dispatched: deque[int] = deque()
+        self._done: set[int] = set()
+
+    def dispatch(self, offset: int) -> None:
+        self._dispatched.append(offset)
+
+    def done(self, offset: int) -> None:
+        self._done.add(offset)
+
+    def advance(self) -> int | None:
+        """Offset to commit if the finished prefix grew, None otherwise."""
+        committable = None
+        while self._dispatched and self._dispatched[0] in self._done:
+            offset = self._dispatched.popleft()
+            self._done.discard(offset)
+            committable = offset + 1
+        return committable
+
+
+class OffsetTracker:
+    """Commits each partition up to its first unfinished message.
+
+    Orders finish out of order on the processor thread; their completions
+    are queued and folded in by the consumer thread, so no locking is needed.
+    """
+    def __init__(self) -> None:
+        self._partitions: dict[tuple[str, int], PartitionOffsets] = {}
+        self._completed: SimpleQueue[tuple[tuple[str, int], int]] = SimpleQueue()
+
+    def track(self, msg: Message, future: Future | None) -> None:
+        """Record a dispatched message; future None means nothing to wait for."""
+        key, offset = (msg.topic(), msg.partition()), msg.offset()
+        self._partitions.setdefault(key, PartitionOffsets()).dispatch(offset)
+        if future is None:
+            self._completed.put((key, offset))
+        else:
+            future.add_done_callback(lambda f: self._complete(key, offset, f))
+
+    def _complete(self, key: tuple[str, int], offset: int, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            # Never committed past; redelivered after a restart or rebalance
+            log.error(f"ERROR: Consumer message {key[0]}[{key[1]}]@{offset} not processed")
+            return
+        self._completed.put((key, offset))
+
+    def committable(self, keys: set[tuple[str, int]] | None = None) -> list[TopicPartition]:
+        """Offsets that moved since the last call, limited to keys if given."""
+        while True:
+            try:
+                key, offset = self._completed.get_nowait()
+            except Empty:
+                break
+            if key in self._partitions:
+                self._partitions[key].done(offset)
+        offsets = []
+        for (topic, partition), tracked in self._partitions.items():
+            if keys is not None and (topic, partition) not in keys:
+                continue
+            offset = tracked.advance()
+            if offset is not None:
+                offsets.append(TopicPartition(topic, partition, offset))
+        return offsets
+
+    def revoke(self, consumer: Consumer, partitions: list[TopicPartition]) -> None:
+        """on_revoke callback: commit what is done and forget the partitions.
+
+        Orders still running for them finish, but the new owner gets their
+        messages again; marking an order PAID is idempotent.
+        """
+        keys = {(tp.topic, tp.partition) for tp in partitions}
+        offsets = self.committable(keys)
+        if offsets:
+            try:
+                consumer.commit(offsets=offsets, asynchronous=False)
+            except Exception as e:
+                log.error(f"ERROR: Consumer commit on revoke failed ex {e}")
+        for key in keys:
+            self._partitions.pop(key, None)
+
+
+def process_batch(messages: list[Message], tracker: OffsetTracker) -> int:
+    """Dispatch a batch without waiting for it; return the number of messages handled.
+
+    Messages that cannot even be decoded go straight to the dead-letter topic.
+    """
+    handled = 0
+    for msg in messages:
+        if msg.error():
+            if msg.error().code() != KafkaError._PARTITION_EOF:
+                log.debug(f"ConsumerError: {msg.error()}")
+            continue
+        try:
+            future = handle_message(msg)
+        except Exception as e:
+            log.error(f"ErrorProcessing_message {msg.topic()}[{msg.partition()}]@{msg.offset()}: {e}")
+            future = processor.submit_dead_letter(msg.value().decode('utf-8', 'replace'), str(e))
+        tracker.track(msg, future)
+        handled += 1
+    return handled
+
+
+def run_batch_consumer(consumer: Consumer, tracker: OffsetTracker):
+    """Consume in batches and commit each partition as far as its orders are done.
+
+    The poll loop never waits for orders; once the processor holds
+    max_pending of them the assigned partitions are paused, and resumed
+    when it drained to half of that.
+    """
+    paused = False
+    while True:
+        messages = consumer.consume(
+            num_messages=settings.kafka_consumer_batch_size,
+            timeout=settings.kafka_consumer_flush_interval,
+        )
+        if messages:
+            handled = process_batch(messages, tracker)
+            log.debug(f"Consumer batch of {len(messages)} messages, handled {handled}")
+
+        offsets = tracker.committable()
+        if offsets:
+            consumer.commit(offsets=offsets, asynchronous=True)
+
+        if processor.saturated:
+            # Also covers partitions assigned since the last pause
+            consumer.pause(consumer.assignment())
+            paused = True
+        elif paused and processor.pending <= processor.max_pending // 2:
+            consumer.resume(consumer.assignment())
+            paused = False
 
 if __name__ == "__main__":
     log.debug("Starting Kafka consumers ...")
-    run_consumer()
+    processor.start()
+    try:
+        if settings.kafka_consumer_mode == "single":
+            run_consumer(create_consumer())
+        else:
+            tracker = OffsetTracker()
+            run_batch_consumer(create_consumer(on_revoke=tracker.revoke), tracker)
+    finally:
+        processor.stop()
@@ -4,6 +4,20 @@ import json
 
 from aiokafka import AIOKafkaProducer
 
+from app.core.config import settings
+
+
+def producer_config() -> dict:
+    """Producer tuning taken from settings."""
+    acks = settings.kafka_acks
+    return {
+        "bootstrap_servers": settings.kafka_bootstrap_servers,
+        "acks": int(acks) if acks.isdigit() else acks,
+        "linger_ms": settings.kafka_linger_ms,
+        "max_batch_size": settings.kafka_max_batch_size,
+        "compression_type": settings.kafka_compression_type,
+    }
+
 
 class KafkaManager:
     _producer = None
@@ -13,8 +27,8 @@ class KafkaManager:
         """Initialize and start the Kafka producer with a retry loop."""
         if cls._producer is None:
             cls._producer = AIOKafkaProducer(
-                bootstrap_servers='kafka:9092',
-                value_serializer=lambda v: json.dumps(v).encode('utf-8')
+                **producer_config(),
+                value_serializer=lambda v: json.dumps(v, default=str).encode('utf-8')
             )
             # Retry connection until successful
             while True:
@@ -26,7 +40,7 @@ class KafkaManager:
 
     @classmethod
     async def stop(cls):
-        """Gracefully shut down the Kafka producer."""
+        """Gracefully shut down the Kafka producer, flushing pending messages."""
         if cls._producer:
             await cls._producer.stop()
             cls._producer = None
@@ -38,4 +52,17 @@ class KafkaManager:
             await cls.start()
         await cls._producer.send_and_wait(topic, data)
 
+    @classmethod
+    async def send_batch(cls, topic, messages):
+        """Enqueue all messages at once and wait until every one is acknowledged.
+
+        The producer packs messages enqueued together into shared batches,
+        so this costs about one broker round trip instead of one per message.
+        """
+        if cls._producer is None:
+            await cls.start()
+        futures = [await cls._producer.send(topic, data) for data in messages]
+        await asyncio.gather(*futures)
+
 send_to_kafka = KafkaManager.send
+send_batch_to_kafka = KafkaManager.send_batch
@@ -0,0 +1,57 @@
+"""Relay worker draining the order outbox table into Kafka."""
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.kafka.kafka_client import KafkaManager, send_batch_to_kafka
+from app.repositories.outbox import OutboxRepository
+from app.utils.logs import log
+
+
+async def relay_once(
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> int:
+    """Publish one batch of outbox events and delete them once Kafka acked.
+
+    If publishing fails the transaction rolls back, the rows stay in the
+    outbox and are picked up again, which gives at-least-once delivery.
+    """
+    async with session_factory() as session, session.begin():
+        repo = OutboxRepository(session)
+        events = await repo.claim_batch(settings.outbox_batch_size)
+        if not events:
+            return 0
+
+        by_topic = defaultdict(list)
+        for event in events:
+            by_topic[event.topic].append(event.payload)
+        for topic, payloads in by_topic.items():
+            await send_batch_to_kafka(topic, payloads)
+
+        await repo.delete_events([event.id for event in events])
+        return len(events)
+
+
+async def run_relay():
+    """Drain the outbox continuously; sleep only when it has been emptied."""
+    await KafkaManager.start()
+    try:
+        while True:
+            try:
+                sent = await relay_once()
+                log.debug(f"OutboxRelay sent {sent} events")
+            except Exception as ex:
+                log.error(f"ERROR: OutboxRelay batch failed ex {ex}")
+                sent = 0
+            if sent < settings.outbox_batch_size:
+                await asyncio.sleep(settings.outbox_poll_interval)
+    finally:
+        await KafkaManager.stop()
+
+if __name__ == "__main__":
+    log.debug("Starting outbox relay ...")
+    asyncio.run(run_relay())
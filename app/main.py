@@ -2,19 +2,23 @@
 Orders Service entry point.
 Configures FastAPI app, CORS, Rate Limiting, and API routing.
 """
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from app.api.auth import router as auth_router
+from app.api.metrics import router as metrics_router
 from app.api.orders import router as orders_router
 from app.core.config import settings
-from app.core.redis_init import rdb
-from app.kafka.kafka_client import KafkaManager
+from app.core.database import replicas
+from app.core.redis_init import cache_rdb, rdb
+from app.services.order_service import listen_order_invalidations
 from app.utils.limiter import limiter
 from app.utils.logs import log
 
@@ -23,16 +27,29 @@ from app.utils.logs import log
 async def lifespan(app: FastAPI):
     """
     Manage infrastructure connections.
-    Establish rdb and Kafka sessions on startup; close sessions on shutdown.
+    Establish rdb session, the order cache invalidation listener and, with
+    read replicas configured, the replica lag monitor on startup;
+    close them on shutdown.
+    Order events go through the outbox, so the API needs no Kafka producer.
     """
     await rdb.ping()
-    await KafkaManager.start()
+    invalidations = asyncio.create_task(listen_order_invalidations())
+    replica_monitor = None
+    if replicas:
+        await replicas.check_lag(timeout=settings.replica_lag_check_interval)
+        replica_monitor = asyncio.create_task(
+            replicas.monitor(settings.replica_lag_check_interval)
+        )
     log.debug("Services started")
 
     yield
 
-    await KafkaManager.stop()
+    invalidations.cancel()
+    if replica_monitor:
+        replica_monitor.cancel()
+        await replicas.dispose()
     await rdb.close()
+    await cache_rdb.close()
     log.debug("Services stopped")
 
 
@@ -42,6 +59,7 @@ app = FastAPI(
     version="0.1.0",
     swagger_ui_parameters={"defaultModelsExpandDepth": -1},
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
@@ -61,4 +79,5 @@ app.add_middleware(SlowAPIMiddleware)
 
 app.include_router(auth_router, prefix=settings.api_prefix)
 app.include_router(orders_router, prefix=settings.api_prefix)
+app.include_router(metrics_router, prefix=settings.api_prefix)
 
@@ -4,6 +4,8 @@ from decimal import Decimal
 from typing import Any
 
 from sqlalchemy import (
+    DDL,
+    BigInteger,
     DateTime,
     Enum,
     ForeignKey,
@@ -11,6 +13,7 @@ from sqlalchemy import (
     Integer,
     Numeric,
     String,
+    event,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -39,7 +42,8 @@ class Order(Base):
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     user: Mapped["User"] = relationship("User", back_populates="orders")
-    items: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False, default=dict)
+    # Line items: [{"sku": ..., "qty": ..., "unit_price": ...}]
+    items: Mapped[list[dict[str, Any]]] = mapped_column(JSONB, nullable=False, default=list)
     total_price: Mapped[Decimal] = mapped_column(
         Numeric(10, 2),
         default=Decimal("0.00"),
@@ -50,10 +54,102 @@ class Order(Base):
         nullable=False,
         index=True,
     )
+    # Partition key, so part of the table's primary key (id, created_at)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        primary_key=True,
+        index=True,
     )
     __table_args__ = (
         Index('ix_order_user_created', 'user_id', 'created_at'),  # поиск заказов пользователя
         Index('ix_order_status_created', 'status', 'created_at'), # фильтр по статусу + дата
+        # orders containing a SKU: items @> '[{"sku": ...}]'
+        Index(
+            'ix_order_items',
+            'items',
+            postgresql_using='gin',
+            postgresql_ops={'items': 'jsonb_path_ops'},
+        ),
+        # Monthly partitions, managed by app.core.partitions
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    # uuid4 ids are unique in practice; the ORM identifies orders by id alone
+    __mapper_args__ = {"primary_key": [id]}
+
+
+class OrderOutbox(Base):
+    """Order events waiting to be relayed to Kafka, written in the order's transaction."""
+    __tablename__ = "order_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    topic: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
     )
+
+
+class OrderCount(Base):
+    """Exact number of orders per user and status.
+
+    Maintained by statement-level triggers on orders, so every write path
+    (ORM, bulk insert, status updates by the processor) keeps it in step.
+    """
+    __tablename__ = "order_counts"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    status: Mapped[str] = mapped_column(
+        Enum('PENDING', 'PAID', 'SHIPPED', 'CANCELED', name='order_status'),
+        primary_key=True,
+    )
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+# Rows are applied in key order so concurrent statements lock them alike
+ORDER_COUNTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION order_counts_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT user_id, status, count(*) FROM new_rows
+        GROUP BY user_id, status ORDER BY user_id, status
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE order_counts c SET count = c.count - d.n
+        FROM (SELECT user_id, status, count(*) AS n FROM old_rows
+              GROUP BY user_id, status ORDER BY user_id, status) d
+        WHERE c.user_id = d.user_id AND c.status = d.status;
+    ELSE
+        INSERT INTO order_counts (user_id, status, count)
+        SELECT user_id, status, sum(delta) FROM (
+            SELECT user_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT user_id, status, 1 FROM new_rows
+        ) d
+        GROUP BY user_id, status HAVING sum(delta) <> 0 ORDER BY user_id, status
+        ON CONFLICT (user_id, status) DO UPDATE SET count = order_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+ORDER_COUNTS_TRIGGERS = [
+    "CREATE TRIGGER order_counts_insert AFTER INSERT ON orders"
+    " REFERENCING NEW TABLE AS new_rows"
+    " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()",
+    "CREATE TRIGGER order_counts_update AFTER UPDATE ON orders"
+    " REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"
+    " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()",
+    "CREATE TRIGGER order_counts_delete AFTER DELETE ON orders"
+    " REFERENCING OLD TABLE AS old_rows"
+    " FOR EACH STATEMENT EXECUTE FUNCTION order_counts_apply()",
+]
+
+# metadata.create_all gets one catch-all partition instead of monthly ones
+ORDERS_DEFAULT_PARTITION = "CREATE TABLE orders_default PARTITION OF orders DEFAULT"
+
+# Alembic installs these in a migration; this covers metadata.create_all
+for statement in [ORDERS_DEFAULT_PARTITION, ORDER_COUNTS_FUNCTION, *ORDER_COUNTS_TRIGGERS]:
+    event.listen(Order.__table__, "after_create", DDL(statement))
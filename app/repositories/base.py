@@ -1,8 +1,10 @@
 """Base repository with common CRUD operations"""
+import json
 from typing import Any, Generic, TypeVar
 
 from pydantic import BaseModel
-from sqlalchemy import func, select
+from sqlalchemy import Select, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import Base
@@ -32,46 +34,82 @@ class BaseRepository(Generic[ModelType]):
         filters: dict[str, Any] | None = None,
     ) -> list[ModelType]:
         """Get list with pager and filters."""
-        query = select(self.model)
+        query = self._filtered(select(self.model), filters)
 
-        if filters:
-            for key, value in filters.items():
-                if hasattr(self.model, key) and value is not None:
-                    query = query.where(getattr(self.model, key) == value)
-
-        result = await self.session.execute(query)
+        result = await self.session.execute(query.offset(skip).limit(limit))
         return list(result.scalars().all())
 
     async def count(self, filters: dict[str, Any] | None = None) -> int:
-        """Get count of rows."""
-        query = select(func.count()).select_from(self.model)
+        """Get count of rows. Scans every match; see estimate_count."""
+        query = self._filtered(select(func.count()).select_from(self.model), filters)
+
+        result = await self.session.execute(query)
+        return result.scalar_one()
 
+    async def estimate_count(self, filters: dict[str, Any] | None = None) -> int:
+        """Approximate count from planner statistics, without touching rows.
+
+        Unfiltered it is the table's reltuples (summed over partitions), with
+        filters the row estimate of the query plan. As fresh as the last
+        ANALYZE / autovacuum.
+        """
+        if not filters:
+            result = await self.session.execute(
+                text(
+                    "SELECT sum(GREATEST(c.reltuples, 0))::bigint FROM pg_class c"
+                    " WHERE c.oid = CAST(:table AS regclass)"
+                    " OR c.oid IN (SELECT inhrelid FROM pg_inherits"
+                    " WHERE inhparent = CAST(:table AS regclass))"
+                ),
+                {"table": self.model.__tablename__},
+            )
+            return result.scalar_one() or 0
+
+        query = self._filtered(select(self.model), filters)
+        sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        result = await self.session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _filtered(self, query: Select, filters: dict[str, Any] | None) -> Select:
+        """Apply equality filters on known columns; None values are ignored."""
         if filters:
             for key, value in filters.items():
                 if hasattr(self.model, key) and value is not None:
                     query = query.where(getattr(self.model, key) == value)
-
-        result = await self.session.execute(query)
-        return result.scalar_one()
+        return query
 
     async def create(self, **data: Any) -> ModelType:
-        """Create new record"""
-        instance = self.model(**data)
-        self.session.add(instance)
-        await self.session.flush()
-        await self.session.refresh(instance)
-        return instance
+        """Create new record with one INSERT ... RETURNING"""
+        result = await self.session.scalars(
+            insert(self.model).values(**data).returning(self.model)
+        )
+        return result.one()
 
     async def update(self, instance: ModelType, data: BaseModel) -> ModelType:
-        """Update the existing record"""
-        for field, value in data:
-            if hasattr(instance, field):
-                log.debug(f"instance {field} {getattr(instance, field)}")
-                setattr(instance, field, value)
-
-        await self.session.flush()
-        await self.session.refresh(instance)
-        return instance
+        """Update the existing record; the instance is refreshed from RETURNING"""
+        res = await self.update_by_id(instance.id, data)
+        if res is None:
+            raise LookupError(f"{self.model.__name__} {instance.id} no longer exists")
+        return res
+
+    async def update_by_id(
+        self, id: Any, data: BaseModel | dict[str, Any]
+    ) -> ModelType | None:
+        """UPDATE ... WHERE id = :id RETURNING the row; None if there is no such row"""
+        fields = data.items() if isinstance(data, dict) else data
+        values = {field: value for field, value in fields if hasattr(self.model, field)}
+        log.debug(f"update {self.model.__name__} {id} fields {list(values)}")
+        result = await self.session.scalars(
+            update(self.model)
+            .where(self.model.id == id)
+            .values(**values)
+            .returning(self.model)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        return result.one_or_none()
 
     async def delete(self, instance: ModelType) -> None:
         """Delete the record"""
@@ -1,10 +1,73 @@
+import json
 import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
 
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    String,
+    and_,
+    any_,
+    bindparam,
+    cast,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from app.models.models import Order
+from app.models.models import Order, OrderCount
 from app.repositories.base import BaseRepository
-from app.schemas.order_schemas import OrderCreate, OrderStatus
+from app.schemas.order_schemas import OrderCreate, OrderSearch, OrderStatus
+
+
+def order_values(order: OrderCreate) -> dict[str, Any]:
+    """Column values of an order: items as plain JSON, the total summed from them."""
+    return {
+        "items": [item.model_dump(mode="json") for item in order.items],
+        "total_price": order.total_price,
+        "status": order.status.value,
+    }
+
+
+def sku_lines(sku: str) -> ColumnElement[Any]:
+    """JSONB value that `items @>` matches for orders with a line of sku.
+
+    Built from a text literal so the query can still be compiled with
+    literal values, as EXPLAIN-based estimates do.
+    """
+    return cast(literal(json.dumps([{"sku": sku}]), String), JSONB)
+
+
+def newest_first(
+    query: Select,
+    limit: int,
+    after: tuple[datetime, uuid.UUID] | None = None,
+    entity: Any = Order,
+) -> Select:
+    """Page of query in (created_at, id) descending order, after a keyset cursor.
+
+    The cursor is a plain range on created_at plus a tie-break on id, so an
+    index ending in created_at serves every page at the same cost.
+    """
+    if after is not None:
+        created_at, order_id = after
+        query = query.where(
+            entity.created_at <= created_at,
+            or_(
+                entity.created_at < created_at,
+                and_(entity.created_at == created_at, entity.id < order_id),
+            ),
+        )
+    return query.order_by(entity.created_at.desc(), entity.id.desc()).limit(limit)
 
 
 class OrderRepository(BaseRepository[Order]):
@@ -15,29 +78,72 @@ class OrderRepository(BaseRepository[Order]):
     async def create_order(
         self,
         user_id: int,
-        items: str,
-        total_price: float,
-        status: OrderStatus,
+        order: OrderCreate,
     ) -> Order:
-        res = await self.create(
-            user_id=user_id,
-            items=items,
-            total_price=total_price,
-            status=status.value,
-        )
+        res = await self.create(user_id=user_id, **order_values(order))
         return res
 
+    async def create_orders(
+        self,
+        user_id: int,
+        orders: list[OrderCreate],
+    ) -> list[Order]:
+        """Insert many orders with one INSERT ... RETURNING, in input order."""
+        rows = [{"user_id": user_id, **order_values(order)} for order in orders]
+        result = await self.session.scalars(
+            insert(Order).returning(Order, sort_by_parameter_order=True),
+            rows,
+        )
+        return list(result.all())
+
     async def update_order(
         self,
-        order: Order,
+        id: uuid.UUID,
         data: OrderCreate,
-    ) -> Order:
-        res = await self.update(
-            order,
-            data=data,
-        )
+    ) -> Order | None:
+        """Update an order in one statement; None if it does not exist."""
+        res = await self.update_by_id(id, data=order_values(data))
         return res
 
+    async def set_status(
+        self,
+        id: uuid.UUID,
+        from_status: OrderStatus,
+        to_status: OrderStatus,
+    ) -> int | None:
+        """Move an order between statuses.
+
+        Returns the owner's user_id, or None if the order was not in from_status.
+        """
+        result = await self.session.execute(
+            update(Order)
+            .where(Order.id == id, Order.status == from_status.value)
+            .values(status=to_status.value)
+            .returning(Order.user_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+
+    async def count_orders(
+        self,
+        user_id: int | None = None,
+        status: OrderStatus | None = None,
+    ) -> int:
+        """Exact count from the trigger-maintained order_counts table.
+
+        A user's count reads at most one row per status; without a user the
+        rows of all users are summed, which is still far less than orders.
+        There is deliberately no all-users row: every order write would
+        have to lock it until commit.
+        """
+        query = select(func.coalesce(func.sum(OrderCount.count), 0))
+        if user_id is not None:
+            query = query.where(OrderCount.user_id == user_id)
+        if status is not None:
+            query = query.where(OrderCount.status == status.value)
+        result = await self.session.execute(query)
+        return int(result.scalar_one())
+
     async def get_order(
         self,
         id: uuid.UUID,
@@ -45,9 +151,112 @@ class OrderRepository(BaseRepository[Order]):
         res = await self.get_by_id(id=id)
         return res
 
+    async def get_orders(
+        self,
+        ids: list[uuid.UUID],
+    ) -> list[Order]:
+        """Fetch many orders with one `id = ANY(:ids)` query."""
+        result = await self.session.execute(
+            select(Order).where(
+                Order.id == any_(bindparam("ids", ids, type_=ARRAY(UUID(as_uuid=True))))
+            )
+        )
+        return list(result.scalars().all())
+
     async def get_order_user(
         self,
         user_id: int,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None,
     ) -> list[Order]:
-        res = await self.get_multi(filters={"user_id":user_id})
-        return res
+        """Newest-first page of user orders, keyset-paginated on (created_at, id).
+
+        The range predicate on created_at keeps the scan on ix_order_user_created,
+        so every page costs the same no matter how deep the cursor is.
+        """
+        query = newest_first(select(Order).where(Order.user_id == user_id), limit, after)
+
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    def search_query(
+        self,
+        search: OrderSearch,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None,
+    ) -> Select:
+        """Newest-first page of orders matching search (older_than must be
+        folded into created_to by the caller).
+
+        Every predicate compares a bare column, so the planner can use
+        ix_order_user_created for a user, ix_order_status_created for a
+        status and prune partitions on the created_at range. Several
+        statuses without a user become one index scan per status, each
+        limited, merged by a UNION ALL: an IN list would read and sort
+        every match before the LIMIT. total_price only filters; sku is a
+        JSONB containment test, served by the ix_order_items GIN index.
+        """
+        conditions: list[ColumnElement[bool]] = []
+        if search.user_id is not None:
+            conditions.append(Order.user_id == search.user_id)
+        if search.created_from is not None:
+            conditions.append(Order.created_at >= search.created_from)
+        if search.created_to is not None:
+            conditions.append(Order.created_at < search.created_to)
+        if search.price_min is not None:
+            conditions.append(Order.total_price >= search.price_min)
+        if search.price_max is not None:
+            conditions.append(Order.total_price <= search.price_max)
+        if search.sku is not None:
+            conditions.append(Order.items.contains(sku_lines(search.sku)))
+
+        statuses = sorted({status.value for status in search.statuses})
+        if len(statuses) == 1:
+            conditions.append(Order.status == statuses[0])
+        elif statuses and search.user_id is not None:
+            conditions.append(Order.status.in_(statuses))
+        elif statuses:
+            branches = [
+                newest_first(select(Order).where(*conditions, Order.status == status), limit, after)
+                for status in statuses
+            ]
+            merged = aliased(Order, union_all(*branches).subquery("matches"))
+            return newest_first(select(merged), limit, entity=merged)
+
+        return newest_first(select(Order).where(*conditions), limit, after)
+
+    async def search_orders(
+        self,
+        search: OrderSearch,
+        limit: int,
+        after: tuple[datetime, uuid.UUID] | None = None,
+    ) -> list[Order]:
+        result = await self.session.execute(self.search_query(search, limit, after))
+        return list(result.scalars().all())
+
+    async def stream_orders(
+        self,
+        fetch_size: int,
+        user_id: int | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ) -> AsyncIterator[Order]:
+        """Yield matching orders oldest first through a server-side cursor.
+
+        Rows are fetched fetch_size at a time, so memory does not grow with
+        the size of the result.
+        """
+        query = select(Order)
+        if user_id is not None:
+            query = query.where(Order.user_id == user_id)
+        if created_from is not None:
+            query = query.where(Order.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(Order.created_at < created_to)
+        query = query.order_by(Order.created_at, Order.id).execution_options(
+            yield_per=fetch_size
+        )
+
+        result = await self.session.stream_scalars(query)
+        async for order in result:
+            yield order
@@ -0,0 +1,48 @@
+from typing import Any
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import OrderOutbox
+from app.repositories.base import BaseRepository
+
+
+class OutboxRepository(BaseRepository[OrderOutbox]):
+    """Repository for the order events outbox"""
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(OrderOutbox, session)
+
+    async def add_events(
+        self,
+        topic: str,
+        payloads: list[dict[str, Any]],
+    ) -> None:
+        """Queue events in the current transaction."""
+        await self.session.execute(
+            insert(OrderOutbox),
+            [{"topic": topic, "payload": payload} for payload in payloads],
+        )
+
+    async def claim_batch(
+        self,
+        limit: int,
+    ) -> list[OrderOutbox]:
+        """Lock the oldest unsent events; rows locked by other relays are skipped."""
+        result = await self.session.execute(
+            select(OrderOutbox)
+            .order_by(OrderOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+
+    async def delete_events(
+        self,
+        ids: list[int],
+    ) -> None:
+        """Drop events that were delivered."""
+        await self.session.execute(
+            delete(OrderOutbox)
+            .where(OrderOutbox.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.models import User
 from app.repositories.base import BaseRepository
+from app.services.user_cache import user_cache
 
 
 class UserRepository(BaseRepository[User]):
@@ -31,3 +32,8 @@ class UserRepository(BaseRepository[User]):
             hashed_password=hashed_password,
             name=name,
         )
+
+    async def delete(self, instance: User) -> None:
+        """Удалить пользователя и сбросить его из кэша авторизации."""
+        await super().delete(instance)
+        await user_cache.invalidate(instance.id)
@@ -1,8 +1,17 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 from enum import Enum
+from typing import Annotated, Any
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import (
+    AwareDatetime,
+    BaseModel,
+    ConfigDict,
+    Field,
+    PlainSerializer,
+    model_validator,
+)
 
 
 class OrderStatus(str, Enum):
@@ -12,15 +21,107 @@ class OrderStatus(str, Enum):
     CANCELED = "CANCELED"
 
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+# Numeric(10, 2) holds totals below this
+MAX_TOTAL_PRICE = Decimal("100000000")
+ORDER_ITEMS_MAX = 100
+
+# Exact cents in Python, a plain number in JSON
+Money = Annotated[
+    Decimal,
+    Field(ge=0, max_digits=10, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+
+
+class OrderItem(BaseModel):
+    sku: str = Field(min_length=1, max_length=64)
+    qty: int = Field(gt=0)
+    unit_price: Money
+
+
 class OrderCreate(BaseModel):
-    items: str
-    total_price: float
+    """total_price is not accepted from clients, it is summed from the items."""
+
+    items: list[OrderItem] = Field(min_length=1, max_length=ORDER_ITEMS_MAX)
     status: OrderStatus = OrderStatus.PENDING
 
+    @property
+    def total_price(self) -> Decimal:
+        return sum((item.qty * item.unit_price for item in self.items), Decimal("0"))
+
+    @model_validator(mode="after")
+    def _total_fits(self) -> "OrderCreate":
+        if self.total_price >= MAX_TOTAL_PRICE:
+            raise ValueError(f"Order total must be below {MAX_TOTAL_PRICE}")
+        return self
 
-class OrderResponse(OrderCreate):
+
+class OrderResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
+    items: list[OrderItem]
+    total_price: float
+    status: OrderStatus
     id: uuid.UUID
     user_id: int
     created_at: datetime
+
+
+class OrderPage(BaseModel):
+    """One page of orders plus the cursor for the next one."""
+
+    items: list[OrderResponse]
+    next_cursor: str | None = None
+    total: int | None = None
+
+
+class OrderBatchCreate(BaseModel):
+    """Raw orders are validated one by one so a bad item fails alone."""
+
+    orders: list[dict[str, Any]] = Field(min_length=1)
+
+
+class OrderBatchItemResult(BaseModel):
+    index: int
+    ok: bool
+    order: OrderResponse | None = None
+    error: str | None = None
+
+
+class OrderBatchResponse(BaseModel):
+    results: list[OrderBatchItemResult]
+
+
+class OrderLookup(BaseModel):
+    """One entry of a multi-get, in request order."""
+
+    id: uuid.UUID
+    found: bool
+    order: OrderResponse | None = None
+
+
+class OrderCountResponse(BaseModel):
+    """exact=False counts are planner estimates."""
+
+    count: int
+    exact: bool
+
+
+class OrderSearch(BaseModel):
+    """Filters of an order search. created_at is matched on [from, to),
+    total_price inclusively; older_than tightens created_to to now - older_than;
+    sku keeps orders with a line of that SKU."""
+
+    statuses: list[OrderStatus] = []
+    user_id: int | None = None
+    created_from: AwareDatetime | None = None
+    created_to: AwareDatetime | None = None
+    older_than: timedelta | None = None
+    price_min: Money | None = None
+    price_max: Money | None = None
+    sku: str | None = None
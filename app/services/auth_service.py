@@ -5,6 +5,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.user import UserRepository
 from app.schemas.auth_schemas import LoginRequest, TokenPair, UserContext
 from app.services.jwt_services import JWTService
+from app.utils.executor import ExecutorSaturatedError
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, retry later",
+        headers={"Retry-After": "1"},
+    )
 
 
 class AuthService:
@@ -20,9 +29,14 @@ class AuthService:
         user_repo = UserRepository(db)
         user = await user_repo.get_by_email(request.email)
 
-        if not user or not self.jwt_service.verify_password(
-            request.password, user.hashed_password
-        ):
+        try:
+            valid = user is not None and await self.jwt_service.verify_password_async(
+                request.password, user.hashed_password
+            )
+        except ExecutorSaturatedError:
+            raise _busy() from None
+
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -47,7 +61,10 @@ class AuthService:
                 detail="User with this email already exists",
             )
 
-        hashed_password = self.jwt_service.hash_password(password)
+        try:
+            hashed_password = await self.jwt_service.hash_password_async(password)
+        except ExecutorSaturatedError:
+            raise _busy() from None
 
         user = await user_repo.create(
             email=email,
@@ -0,0 +1,74 @@
+"""Streaming export of orders as NDJSON or CSV."""
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Callable
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import Order
+from app.repositories.order import OrderRepository
+from app.schemas.order_schemas import ExportFormat, OrderResponse
+
+CSV_COLUMNS = ["id", "user_id", "created_at", "status", "total_price", "items"]
+
+
+class OrderExportService:
+    """Service for exporting orders without loading them all into memory."""
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ) -> None:
+        # The response body is produced after the request handler returns,
+        # so the export owns its session instead of borrowing the request one.
+        self.session_factory = session_factory
+
+    async def stream(
+        self,
+        fmt: ExportFormat,
+        user_id: int | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Yield the export body in chunks of settings.export_chunk_rows rows."""
+        to_row = _ndjson_row if fmt == ExportFormat.NDJSON else _csv_row
+
+        if fmt == ExportFormat.CSV:
+            yield _csv_line(CSV_COLUMNS).encode("utf-8")
+
+        async with self.session_factory() as session:
+            repo = OrderRepository(session)
+            chunk: list[str] = []
+            async for order in repo.stream_orders(
+                fetch_size=settings.export_fetch_size,
+                user_id=user_id,
+                created_from=created_from,
+                created_to=created_to,
+            ):
+                chunk.append(to_row(order))
+                if len(chunk) >= settings.export_chunk_rows:
+                    yield "".join(chunk).encode("utf-8")
+                    chunk.clear()
+
+            if chunk:
+                yield "".join(chunk).encode("utf-8")
+
+
+def _ndjson_row(order: Order) -> str:
+    return OrderResponse.model_validate(order).model_dump_json() + "\n"
+
+
+def _csv_row(order: Order) -> str:
+    res = OrderResponse.model_validate(order).model_dump(mode="json")
+    # The line items go into one cell as compact JSON
+    res["items"] = json.dumps(res["items"], separators=(",", ":"))
+    return _csv_line([res[column] for column in CSV_COLUMNS])
+
+
+def _csv_line(values: list) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue()
@@ -1,3 +1,5 @@
+import hashlib
+import time
 from datetime import UTC, datetime, timedelta
 
 import bcrypt
@@ -6,6 +8,19 @@ from fastapi import HTTPException
 
 from app.core.config import settings
 from app.schemas.auth_schemas import TokenPayload, TokenType
+from app.services.cache import TTLCache
+from app.utils.executor import BoundedExecutor
+
+# Verified tokens by SHA-256 digest; each entry lives until the token's exp
+token_cache: TTLCache[bytes, TokenPayload] = TTLCache(
+    maxsize=settings.token_cache_size, ttl=0
+)
+
+password_executor = BoundedExecutor(
+    max_workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    name="bcrypt",
+)
 
 
 class JWTService:
@@ -27,6 +42,14 @@ class JWTService:
             hashed_password.encode("utf-8"),
         )
 
+    async def hash_password_async(self, password: str) -> str:
+        """Hash a password on the bcrypt pool. Raises ExecutorSaturatedError when full."""
+        return await password_executor.run(self.hash_password, password)
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the bcrypt pool. Raises ExecutorSaturatedError when full."""
+        return await password_executor.run(self.verify_password, plain_password, hashed_password)
+
     def _create_token(
         self,
         user_id: int,
@@ -66,12 +89,25 @@ class JWTService:
             "token_type": "bearer",
         }
 
+    def decode_token(self, token: str) -> TokenPayload:
+        """Decode and verify a JWT token, reusing earlier verifications.
+
+        Raises jwt.PyJWTError for invalid or expired tokens.
+        """
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        if cached := token_cache.get(key):
+            return cached
+
+        payload = TokenPayload(**jwt.decode(token, self.secret_key, algorithms=[self.algorithm]))
+        token_cache.set(key, payload, ttl=payload.exp - time.time())
+        return payload
+
     def verify_token(self, token: str, token_type: TokenType) -> TokenPayload:
         """Decode and validate a JWT token."""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            if payload.get("type") != token_type.value:
-                raise HTTPException(status_code=401, detail="Invalid token type")
-            return TokenPayload(**payload)
+            payload = self.decode_token(token)
         except jwt.PyJWTError as e:
             raise HTTPException(status_code=401, detail="Invalid token") from e
+        if payload.type != token_type.value:
+            raise HTTPException(status_code=401, detail="Invalid token type")
+        return payload
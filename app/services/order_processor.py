@@ -0,0 +1,164 @@
+"""Asyncio engine that processes new orders with bounded concurrency."""
+import asyncio
+import threading
+import uuid
+from collections.abc import Callable, Coroutine
+from concurrent.futures import Future
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.kafka.kafka_client import send_to_kafka
+from app.repositories.order import OrderRepository
+from app.schemas.order_schemas import OrderStatus
+from app.services.order_service import invalidate_order
+from app.utils.logs import log
+
+
+class OrderProcessor:
+    """Runs order processing as awaitable I/O on a dedicated event loop thread.
+
+    Up to `concurrency` orders are processed at the same time. `submit`
+    never blocks: the caller watches `saturated` and stops feeding orders
+    once `max_pending` are queued or running.
+    """
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        concurrency: int = settings.order_processing_concurrency,
+        max_pending: int = settings.order_processing_max_pending,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self._slots = asyncio.Semaphore(concurrency)
+        self._pending_lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+        self.pending = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending >= self.max_pending
+
+    def start(self) -> None:
+        """Start the event loop thread."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="order-processor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the event loop thread; orders still running are abandoned."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+
+    def submit(self, order_data: dict[str, Any]) -> Future:
+        """Schedule processing from another thread, e.g. the Kafka consumer.
+
+        The future resolves once the order is paid or dead-lettered, i.e.
+        when its message may be committed.
+        """
+        return self._schedule(self.process(order_data))
+
+    def submit_dead_letter(self, payload: Any, reason: str) -> Future:
+        """Schedule publishing a message that cannot be processed at all."""
+        return self._schedule(self.dead_letter(payload, reason))
+
+    def _schedule(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        with self._pending_lock:
+            self.pending += 1
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _: Future) -> None:
+        with self._pending_lock:
+            self.pending -= 1
+
+    async def process(self, order_data: dict[str, Any]) -> bool:
+        """Process one order and mark it PAID.
+
+        Failed attempts are retried with exponential backoff; once
+        order_processing_retries are used up the order is published to the
+        dead-letter topic and False is returned.
+        """
+        delay = settings.order_processing_retry_backoff
+        for attempt in range(settings.order_processing_retries + 1):
+            if attempt:
+                self.retried += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.order_processing_retry_backoff_max)
+            try:
+                await self._pay(order_data)
+                self.processed += 1
+                self._report_progress()
+                return True
+            except Exception as ex:
+                error = ex
+                log.error(f"ERROR: OrderProcessor Order {order_data.get('id')} attempt {attempt + 1} failed ex {ex}")
+        self.failed += 1
+        self._report_progress()
+        await self.dead_letter(order_data, str(error))
+        return False
+
+    async def _pay(self, order_data: dict[str, Any]) -> None:
+        order_id = uuid.UUID(str(order_data["id"]))
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                # Stand-in for the payment provider call
+                await asyncio.sleep(settings.order_processing_seconds)
+
+                async with self.session_factory() as session, session.begin():
+                    repo = OrderRepository(session)
+                    user_id = await repo.set_status(order_id, OrderStatus.PENDING, OrderStatus.PAID)
+                    paid = user_id is not None
+                    if not paid and (order := await repo.get_order(order_id)):
+                        # An earlier attempt may have paid it and then failed to invalidate
+                        user_id = order.user_id
+                if user_id is not None:
+                    await invalidate_order(order_id, user_id)
+                log.debug(f"DEBUG: OrderProcessor Order {order_id} processed, paid={paid}")
+            finally:
+                self.in_flight -= 1
+
+    async def dead_letter(self, payload: Any, reason: str) -> None:
+        """Publish payload to the dead-letter topic, retrying until Kafka takes it.
+
+        Until it is published the message's offset must not be committed.
+        """
+        delay = settings.order_processing_retry_backoff
+        while True:
+            try:
+                await send_to_kafka(settings.kafka_dead_letter_topic, {"payload": payload, "error": reason})
+                return
+            except Exception as ex:
+                log.error(f"ERROR: OrderProcessor dead letter failed ex {ex}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.order_processing_retry_backoff_max)
+
+    def stats(self) -> dict[str, int]:
+        """Current progress counters."""
+        return {
+            "pending": self.pending,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+    def _report_progress(self) -> None:
+        done = self.processed + self.failed
+        if done % settings.order_processing_progress_every == 0:
+            log.info(f"OrderProcessor progress {self.stats()}")
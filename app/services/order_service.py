@@ -1,18 +1,78 @@
+import asyncio
+import time
 import uuid
+from collections.abc import Callable
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, TypeVar
 
 from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.redis_init import rdb
-from app.kafka.kafka_client import send_to_kafka
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, after_commit
+from app.core.redis_init import cache_rdb, rdb
 from app.repositories.order import OrderRepository
-from app.schemas.order_schemas import OrderCreate, OrderResponse
+from app.repositories.outbox import OutboxRepository
+from app.schemas.order_schemas import (
+    OrderBatchItemResult,
+    OrderBatchResponse,
+    OrderCountResponse,
+    OrderCreate,
+    OrderLookup,
+    OrderPage,
+    OrderResponse,
+    OrderSearch,
+    OrderStatus,
+)
+from app.services.cache import Codec, SingleFlight, TTLCache, make_codec, should_refresh_early
 from app.utils.logs import log
+from app.utils.pagination import decode_cursor, encode_cursor
+
+ORDER_INVALIDATION_CHANNEL = "orders:invalidate"
+
+M = TypeVar("M", bound=BaseModel)
+
+# Encoding of orders and user pages in Redis
+order_codec = make_codec(settings.order_cache_codec, OrderResponse)
+page_codec = make_codec(settings.order_cache_codec, OrderPage)
+
+# Parsed orders of this worker; kept coherent across workers over Redis pub/sub
+order_l1: TTLCache[uuid.UUID, OrderResponse] = TTLCache(
+    maxsize=settings.order_l1_size, ttl=settings.order_l1_ttl
+)
+# Lets a worker ignore its own invalidation messages
+_worker_token = uuid.uuid4().hex
+
+# Deletes the fill lock only while it still holds our token: once it
+# expired another worker may have taken it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+order_flights: SingleFlight[uuid.UUID, OrderResponse] = SingleFlight()
+# Moving average of a cache fill, the "delta" of early refresh
+_order_fill_seconds = 0.05
 
 
 class OrderService:
     """Service for working with orders."""
-    def __init__(self, order_repo: OrderRepository) -> None:
+    def __init__(
+        self,
+        order_repo: OrderRepository,
+        outbox_repo: OutboxRepository,
+        fill_sessions: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ) -> None:
         self.order_repo = order_repo
+        self.outbox_repo = outbox_repo
+        # Shared fills outlive the request that started them, so they get
+        # sessions of their own from the same source as order_repo's
+        self.fill_sessions = fill_sessions
+
 
     async def create_order(
         self,
@@ -20,33 +80,62 @@ class OrderService:
         user_id: int,
     ) -> OrderResponse:
         """Create new order"""
-        order = await self.order_repo.create_order(
-            user_id=user_id,
-            items=data.items,
-            total_price=data.total_price,
-            status=data.status,
-        )
+        order = await self.order_repo.create_order(user_id=user_id, order=data)
 
-        res = OrderResponse(
-            id=order.id,
-            user_id=order.user_id,
-            created_at=order.created_at,
-            total_price=order.total_price,
-            items=order.items,
-            status=order.status,
-        )
+        result = OrderResponse.model_validate(order)
 
-        """Send task to Kafka queue"""
-        try:
-            await send_to_kafka("orders", {
-                "event_type": "new_order",
-                "data": {"id": order.id, "status": "pending"}
-            })
-            log.debug(f"DEBUG:  send_new_order_event to QUEUE {order}")
-        except Exception as ex:
-            log.error(f"ERROR: can't send_new_order_event to QUEUE {order} ex {ex}")
+        # Queue the event in the order's transaction; outbox_relay publishes it
+        await self.outbox_repo.add_events("orders", [new_order_event(order.id)])
+        log.debug(f"DEBUG:  new_order_event queued in outbox {order.id}")
+
+        # Clients poll right after creating, so make that first read a hit;
+        # get_db runs this before the response goes out
+        after_commit(self.order_repo.session, partial(cache_orders, [result]))
+        self._bump_after_commit(user_id)
 
-        return OrderResponse.model_validate(res)
+        return result
+
+    async def create_orders(
+        self,
+        data: list[dict[str, Any]],
+        user_id: int,
+    ) -> OrderBatchResponse:
+        """Create many orders in one round trip, reporting a result per item"""
+        if len(data) > settings.orders_batch_max:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Batch is limited to {settings.orders_batch_max} orders",
+            )
+
+        results: list[OrderBatchItemResult] = []
+        valid: list[tuple[int, OrderCreate]] = []
+        for index, raw in enumerate(data):
+            try:
+                valid.append((index, OrderCreate.model_validate(raw)))
+            except ValidationError as ex:
+                results.append(OrderBatchItemResult(index=index, ok=False, error=str(ex)))
+
+        if valid:
+            orders = await self.order_repo.create_orders(
+                user_id=user_id,
+                orders=[order for _, order in valid],
+            )
+            created = [OrderResponse.model_validate(order) for order in orders]
+            results += [
+                OrderBatchItemResult(index=index, ok=True, order=order)
+                for (index, _), order in zip(valid, created, strict=True)
+            ]
+
+            await self.outbox_repo.add_events(
+                "orders", [new_order_event(order.id) for order in created]
+            )
+            log.debug(f"DEBUG:  new_order_event batch queued in outbox {len(created)}")
+
+            after_commit(self.order_repo.session, partial(cache_orders, created))
+            self._bump_after_commit(user_id)
+
+        results.sort(key=lambda item: item.index)
+        return OrderBatchResponse(results=results)
 
     async def patch_order(
         self,
@@ -54,74 +143,366 @@ class OrderService:
         data: OrderCreate,
     ) -> OrderResponse:
         """Update order"""
-        order = await self.order_repo.get_order(id=order_id)
+        order = await self.order_repo.update_order(order_id, data)
 
         if not order:
             raise HTTPException(404, "Order not found")
 
-        try:
-            order_res = await self.order_repo.update_order(
-                order,
-                data,
-            )
-        except Exception as ex:
-            log.error(f"order_service Order.patch_order ex {ex}")
-
-        res = OrderResponse(
-            id=order_res.id,
-            user_id=order_res.user_id,
-            created_at=order_res.created_at,
-            total_price=order_res.total_price,
-            items=order_res.items,
-            status=order_res.status,
-        )
-        result = OrderResponse.model_validate(res)
+        result = OrderResponse.model_validate(order)
 
-        await rdb.set(f"order:{order_id}", result.model_dump_json(), ex=300)
+        # After the commit, so a rollback caches nothing and no fill of the
+        # old row can land after this write
+        after_commit(self.order_repo.session, partial(replace_cached_order, result))
+        self._bump_after_commit(result.user_id)
 
         return result
 
+    def _bump_after_commit(self, user_id: int) -> None:
+        """Bump the page version once the write is visible.
+
+        Bumped any earlier, a page read in between would cache the old
+        rows under the new version.
+        """
+        after_commit(self.order_repo.session, partial(bump_user_orders_version, user_id))
+
     async def get_order(
         self,
         order_id: uuid.UUID,
     ) -> OrderResponse:
         """Get order by ID"""
-        if cached := await rdb.get(f"order:{order_id}"):
-            return OrderResponse.model_validate_json(cached)
+        if res := order_l1.get(order_id):
+            return res
 
-        order = await self.order_repo.get_order(id=order_id)
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+        key = f"order:{order_id}"
+        async with cache_rdb.pipeline(transaction=False) as pipe:
+            cached, ttl_ms = await pipe.get(key).pttl(key).execute()
 
-        # Use model_validate directly
-        res = OrderResponse.model_validate(order)
+        if res := _load_cached(order_codec, cached):
+            ttl_left = ttl_ms / 1000 if ttl_ms >= 0 else -1
+            if not should_refresh_early(
+                ttl_left, _order_fill_seconds, settings.order_cache_xfetch_beta
+            ):
+                order_l1.set(order_id, res)
+                return res
+            log.debug(f"get_order early refresh of {key}, ttl {ttl_left}")
 
-        await rdb.set(f"order:{order_id}", res.model_dump_json(), ex=300)
+        # Concurrent misses of this worker share one fill
+        return await order_flights.do(order_id, lambda: self._fill_order(order_id))
 
+    async def get_orders(
+        self,
+        ids: list[uuid.UUID],
+    ) -> list[OrderLookup]:
+        """Get many orders by ID: L1, then one MGET, then one DB query"""
+        if len(ids) > settings.orders_multi_get_max:
+            raise HTTPException(
+                status_code=422,
+                detail=f"At most {settings.orders_multi_get_max} ids per request",
+            )
+
+        found: dict[uuid.UUID, OrderResponse] = {}
+        wanted = []
+        for order_id in dict.fromkeys(ids):
+            if res := order_l1.get(order_id):
+                found[order_id] = res
+            else:
+                wanted.append(order_id)
+
+        misses = []
+        if wanted:
+            cached = await cache_rdb.mget([f"order:{order_id}" for order_id in wanted])
+            for order_id, value in zip(wanted, cached, strict=True):
+                if res := _load_cached(order_codec, value):
+                    found[order_id] = res
+                    order_l1.set(order_id, res)
+                else:
+                    misses.append(order_id)
+
+        if misses:
+            loaded = [
+                OrderResponse.model_validate(order)
+                for order in await self.order_repo.get_orders(misses)
+            ]
+            marks = [written_key("order", order.id) for order in loaded]
+            if await may_cache(self.order_repo.session, marks):
+                await cache_orders(loaded)
+            found.update((order.id, order) for order in loaded)
+
+        return [
+            OrderLookup(id=order_id, found=order_id in found, order=found.get(order_id))
+            for order_id in ids
+        ]
+
+    async def _fill_order(
+        self,
+        order_id: uuid.UUID,
+    ) -> OrderResponse:
+        """Load an order from the DB into Redis and the L1; see may_cache
+        for reads from a replica.
+
+        With order_cache_lock_ms set, a short Redis lock lets one worker do
+        the fill while the others wait for the value to appear.
+        """
+        global _order_fill_seconds
+        key = f"order:{order_id}"
+        lock = f"lock:{key}"
+        lock_ms = settings.order_cache_lock_ms
+        locked = False
+        if lock_ms:
+            locked = await rdb.set(lock, _worker_token, nx=True, px=lock_ms)
+            if not locked and (res := await _wait_for_fill(key, lock_ms)):
+                order_l1.set(order_id, res)
+                return res
+
+        started = time.perf_counter()
+        try:
+            async with self.fill_sessions() as session:
+                order = await OrderRepository(session).get_order(id=order_id)
+            if not order:
+                raise HTTPException(status_code=404, detail="Order not found")
+
+            # Use model_validate directly
+            res = OrderResponse.model_validate(order)
+
+            if await may_cache(session, [written_key("order", order_id)]):
+                await cache_rdb.set(key, order_codec.dumps(res), ex=settings.order_cache_ttl)
+                order_l1.set(order_id, res)
+        finally:
+            if locked:
+                await rdb.eval(RELEASE_LOCK_SCRIPT, 1, lock, _worker_token)
+
+        _order_fill_seconds = 0.8 * _order_fill_seconds + 0.2 * (time.perf_counter() - started)
         return res
 
     async def get_order_user(
         self,
         user_id: int,
-    ) -> list[OrderResponse]:
-        """Get order by user_id"""
-        orders = await self.order_repo.get_order_user(user_id=user_id)
+        limit: int = settings.orders_page_size,
+        cursor: str | None = None,
+    ) -> OrderPage:
+        """Get a page of orders by user_id, cached per user orders version"""
+        version = await rdb.get(user_orders_version_key(user_id)) or "0"
+        page_key = f"orders:user:{user_id}:v{version}:{limit}:{cursor or ''}"
+        if cached := _load_cached(page_codec, await cache_rdb.get(page_key)):
+            return cached
+
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+        limit = max(1, min(limit, settings.orders_page_size_max))
+        # One extra row tells us whether another page exists
+        orders = await self.order_repo.get_order_user(
+            user_id=user_id, limit=limit + 1, after=after
+        )
 
-        if not orders or len(orders) == 0:
+        if not orders and after is None:
             raise HTTPException(status_code=404, detail=f"No orders for user {user_id}")
 
-        res = [
-            OrderResponse(
-                id=order.id,
-                user_id=order.user_id,
-                created_at=order.created_at,
-                total_price=order.total_price,
-                items=order.items,
-                status=order.status,
-            )
-            for order in orders
-        ]
+        page = orders[:limit]
+        next_cursor = None
+        if len(orders) > limit:
+            next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
 
-        log.info(f"--------- get_order Order.get_order_user res {res}")
+        res = OrderPage(
+            items=[OrderResponse.model_validate(order) for order in page],
+            next_cursor=next_cursor,
+            total=await self.order_repo.count_orders(user_id=user_id),
+        )
+
+        log.debug(f"get_order_user user {user_id} page size {len(page)}")
+
+        if await may_cache(self.order_repo.session, [written_key("user", user_id)]):
+            await cache_rdb.set(page_key, page_codec.dumps(res), ex=settings.order_list_cache_ttl)
 
         return res
+
+    async def search_orders(
+        self,
+        search: OrderSearch,
+        limit: int = settings.orders_page_size,
+        cursor: str | None = None,
+    ) -> OrderPage:
+        """Newest-first page of orders matching the filters; not cached"""
+        if search.older_than is not None:
+            cutoff = datetime.now(timezone.utc) - search.older_than
+            created_to = min(search.created_to, cutoff) if search.created_to else cutoff
+            search = search.model_copy(update={"created_to": created_to, "older_than": None})
+        if search.created_from and search.created_to and search.created_from >= search.created_to:
+            raise HTTPException(status_code=400, detail="created_from must be before created_to")
+        if (
+            search.price_min is not None
+            and search.price_max is not None
+            and search.price_min > search.price_max
+        ):
+            raise HTTPException(status_code=400, detail="price_min must not exceed price_max")
+
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+        limit = max(1, min(limit, settings.orders_page_size_max))
+        # One extra row tells us whether another page exists
+        orders = await self.order_repo.search_orders(search, limit=limit + 1, after=after)
+
+        page = orders[:limit]
+        next_cursor = None
+        if len(orders) > limit:
+            next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
+
+        return OrderPage(
+            items=[OrderResponse.model_validate(order) for order in page],
+            next_cursor=next_cursor,
+        )
+
+    async def count_orders(
+        self,
+        user_id: int | None = None,
+        status: OrderStatus | None = None,
+        exact: bool = True,
+    ) -> OrderCountResponse:
+        """Count orders from the maintained counters, or estimate from planner statistics"""
+        if exact:
+            count = await self.order_repo.count_orders(user_id=user_id, status=status)
+        else:
+            count = await self.order_repo.estimate_count(
+                {"user_id": user_id, "status": status.value if status else None}
+            )
+        return OrderCountResponse(count=count, exact=exact)
+
+
+async def _wait_for_fill(key: str, lock_ms: int) -> OrderResponse | None:
+    """Poll Redis while another worker holds the fill lock."""
+    deadline = time.monotonic() + lock_ms / 1000
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+        if res := _load_cached(order_codec, await cache_rdb.get(key)):
+            return res
+    return None
+
+
+def _load_cached(codec: Codec[M], data: bytes | None) -> M | None:
+    """Decode a cached value; one we cannot read counts as a miss.
+
+    That covers entries written by another codec during a rollout.
+    """
+    if data is None:
+        return None
+    try:
+        return codec.loads(data)
+    except Exception as ex:
+        log.warning(f"order cache entry not decodable ex {ex}")
+        return None
+
+
+def new_order_event(order_id: uuid.UUID) -> dict[str, Any]:
+    """Kafka payload announcing a freshly created order."""
+    return {"event_type": "new_order", "data": {"id": str(order_id), "status": "pending"}}
+
+
+async def invalidate_order(order_id: uuid.UUID, user_id: int | None = None) -> None:
+    """Drop cached copies of an order changed outside OrderService."""
+    order_l1.pop(order_id)
+    await rdb.delete(f"order:{order_id}")
+    await mark_written(written_key("order", order_id))
+    await publish_order_invalidation(order_id)
+    if user_id is not None:
+        await bump_user_orders_version(user_id)
+
+
+async def cache_orders(orders: list[OrderResponse]) -> None:
+    """Write orders through to Redis in one pipeline and to the L1."""
+    async with cache_rdb.pipeline(transaction=False) as pipe:
+        for order in orders:
+            pipe.set(f"order:{order.id}", order_codec.dumps(order), ex=settings.order_cache_ttl)
+        await pipe.execute()
+    for order in orders:
+        order_l1.set(order.id, order)
+
+
+async def replace_cached_order(order: OrderResponse) -> None:
+    """Write a changed order through to Redis and the L1 and drop the other workers' copies."""
+    await cache_orders([order])
+    await mark_written(written_key("order", order.id))
+    await publish_order_invalidation(order.id)
+
+
+def written_key(kind: str, id: Any) -> str:
+    return f"written:{kind}:{id}"
+
+
+async def mark_written(key: str) -> None:
+    """Keep replica reads of a just-written row or user page out of the caches.
+
+    The mark outlives the longest lag a replica may have while taking reads.
+    """
+    if settings.replica_urls_list:
+        ttl = settings.replica_max_lag_seconds + settings.replica_lag_check_interval
+        await rdb.set(key, 1, px=int(ttl * 1000))
+
+
+async def may_cache(session: AsyncSession, marks: list[str]) -> bool:
+    """Whether rows just read through session may go into the shared caches.
+
+    Primary reads always may. A replica taking reads is at most
+    replica_max_lag_seconds behind, so its rows are current unless one of
+    them was written within that window, which mark_written records.
+    """
+    if not session.info.get("replica"):
+        return True
+    return not (marks and await rdb.exists(*marks))
+
+
+def user_orders_version_key(user_id: int) -> str:
+    return f"orders:user:{user_id}:ver"
+
+
+async def bump_user_orders_version(user_id: int) -> None:
+    """Invalidate every cached page of a user's orders in O(1).
+
+    Page keys embed the version, so old pages are simply never read
+    again and expire on their own.
+    """
+    await rdb.incr(user_orders_version_key(user_id))
+    await mark_written(written_key("user", user_id))
+
+
+async def publish_order_invalidation(order_id: uuid.UUID) -> None:
+    """Tell the other workers to drop their L1 copy of an order."""
+    await rdb.publish(ORDER_INVALIDATION_CHANNEL, f"{_worker_token}:{order_id}")
+
+
+def handle_order_invalidation(message: str) -> None:
+    """Evict the order named in an invalidation message sent by another worker."""
+    sender, _, order_id = message.partition(":")
+    if sender != _worker_token:
+        order_l1.pop(uuid.UUID(order_id))
+
+
+async def listen_order_invalidations() -> None:
+    """Apply invalidations from other workers until cancelled.
+
+    Messages published while disconnected are lost, so the L1 is cleared
+    on every (re)subscribe.
+    """
+    while True:
+        pubsub = rdb.pubsub()
+        try:
+            await pubsub.subscribe(ORDER_INVALIDATION_CHANNEL)
+            order_l1.clear()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    handle_order_invalidation(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            log.error(f"ERROR: order invalidation listener ex {ex}")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.reset()
@@ -0,0 +1,45 @@
+"""Cache of authenticated users so get_current_user can skip the database."""
+from app.core.config import settings
+from app.core.redis_init import rdb
+from app.schemas.auth_schemas import UserContext
+from app.services.cache import TTLCache
+
+
+class UserCache:
+    """Per-process TTL/LRU of UserContext with an optional shared Redis tier.
+
+    Call `invalidate` whenever a user is deleted or disabled. Other
+    workers drop their local copy at the latest after `ttl` seconds.
+    """
+    def __init__(self, maxsize: int, ttl: float, redis_ttl: int = 0) -> None:
+        self.local: TTLCache[int, UserContext] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.redis_ttl = redis_ttl
+
+    async def get(self, user_id: int) -> UserContext | None:
+        """Return the cached user, trying the process cache first."""
+        if user := self.local.get(user_id):
+            return user
+        if self.redis_ttl and (cached := await rdb.get(f"user:{user_id}")):
+            user = UserContext.model_validate_json(cached)
+            self.local.set(user_id, user)
+            return user
+        return None
+
+    async def set(self, user: UserContext) -> None:
+        """Remember a user loaded from the database."""
+        self.local.set(user.user_id, user)
+        if self.redis_ttl:
+            await rdb.set(f"user:{user.user_id}", user.model_dump_json(), ex=self.redis_ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Forget a user in this process and in Redis."""
+        self.local.pop(user_id)
+        if self.redis_ttl:
+            await rdb.delete(f"user:{user_id}")
+
+
+user_cache = UserCache(
+    maxsize=settings.user_cache_size,
+    ttl=settings.user_cache_ttl,
+    redis_ttl=settings.user_cache_redis_ttl,
+)
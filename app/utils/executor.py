@@ -0,0 +1,47 @@
+"""Size-limited thread pool for CPU-heavy calls made from async handlers."""
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised instead of queueing when the executor backlog is full."""
+
+
+class BoundedExecutor:
+    """Thread pool that rejects new work once `max_queue` calls are waiting.
+
+    Counters are only touched from the event loop thread.
+    """
+    def __init__(self, max_workers: int, max_queue: int, name: str) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run fn(*args) on the pool without blocking the event loop."""
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturatedError
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict[str, int]:
+        """Queue depth and outcome counters."""
+        return {
+            "workers": self.max_workers,
+            "running": min(self.pending, self.max_workers),
+            "queued": max(0, self.pending - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
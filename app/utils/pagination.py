@@ -0,0 +1,21 @@
+"""Opaque keyset cursors for paginated order listings."""
+import base64
+import json
+import uuid
+from datetime import datetime
+
+
+def encode_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    """Pack the sort key of the last row on a page into an opaque token."""
+    raw = json.dumps({"c": created_at.isoformat(), "i": str(id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Unpack a token made by encode_cursor. Raises ValueError on garbage."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["c"]), uuid.UUID(data["i"])
+    except (ValueError, KeyError, TypeError) as ex:
+        raise ValueError("Invalid cursor") from ex
@@ -0,0 +1,20 @@
+"""JSON responses for data that is already validated."""
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+_any = TypeAdapter(Any)
+
+
+class ModelResponse(Response):
+    """Pydantic models (or lists of them) serialized by pydantic-core.
+
+    Returning a Response makes FastAPI skip response_model validation and
+    jsonable_encoder, so a model built once from the ORM row goes straight
+    to bytes. Keep response_model on the route for the OpenAPI schema.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return _any.dump_json(content)
@@ -0,0 +1,124 @@
+"""Per-request CPU of turning ORM rows into response bytes.
+
+"old" is the path before ModelResponse: the service built an
+OrderResponse field by field and validated it again, then FastAPI
+validated it against response_model, ran jsonable_encoder and json.dumps.
+"new" validates the row once and lets pydantic-core write the bytes.
+
+    python -m tests.benchmarks.response_path
+"""
+import asyncio
+import timeit
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.main import app
+from app.models.models import Order
+from app.schemas.order_schemas import OrderPage, OrderResponse
+from app.utils.responses import ModelResponse
+
+NUMBER = 500
+REPEAT = 5
+
+
+def make_row():
+    return Order(
+        id=uuid.uuid4(),
+        user_id=1,
+        items=[
+            {"sku": "item1", "qty": 2, "unit_price": 49.99},
+            {"sku": "item2", "qty": 1, "unit_price": 50.01},
+            {"sku": "item3", "qty": 1, "unit_price": 50.00},
+        ],
+        total_price=Decimal("199.99"),
+        status="PENDING",
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def response_field(path, method):
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and method in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+def field_by_field(row):
+    res = OrderResponse(
+        id=row.id,
+        user_id=row.user_id,
+        created_at=row.created_at,
+        total_price=row.total_price,
+        items=row.items,
+        status=row.status,
+    )
+    return OrderResponse.model_validate(res)
+
+
+async def old_body(field, content):
+    content = await serialize_response(field=field, response_content=content)
+    return JSONResponse(content).body
+
+
+async def per_call_us(fn):
+    """Best of REPEAT runs of NUMBER awaited calls, in microseconds per call."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = timeit.default_timer()
+        for _ in range(NUMBER):
+            await fn()
+        best = min(best, timeit.default_timer() - started)
+    return best / NUMBER * 1e6
+
+
+row = make_row()
+rows = [make_row() for _ in range(50)]
+
+
+async def old_create():
+    return await old_body(response_field("/api/orders/", "POST"), field_by_field(row))
+
+
+async def new_create():
+    return ModelResponse(OrderResponse.model_validate(row)).body
+
+
+# Gets and lists mostly come from cache, as models that only need serializing
+order = OrderResponse.model_validate(row)
+order_page = OrderPage(items=[OrderResponse.model_validate(item) for item in rows])
+
+
+async def old_get():
+    return await old_body(response_field("/api/orders/{order_id}/", "GET"), order)
+
+
+async def new_get():
+    return ModelResponse(order).body
+
+
+async def old_list():
+    return await old_body(response_field("/api/orders/user/{user_id}", "GET"), order_page)
+
+
+async def new_list():
+    return ModelResponse(order_page).body
+
+
+async def main():
+    for name, schema, old, new in [
+        ("create", OrderResponse, old_create, new_create),
+        ("get", OrderResponse, old_get, new_get),
+        ("list of 50", OrderPage, old_list, new_list),
+    ]:
+        same = schema.model_validate_json(await new()) == schema.model_validate_json(await old())
+        old_us = await per_call_us(old)
+        new_us = await per_call_us(new)
+        print(f"{name:10} old {old_us:8.1f} us  new {new_us:8.1f} us  x{old_us / new_us:.1f}  same body {same}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
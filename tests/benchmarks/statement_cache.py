@@ -0,0 +1,76 @@
+"""Repository query latency with and without the prepared statement cache.
+
+Needs a migrated database at DATABASE_URL:
+
+    python -m tests.benchmarks.statement_cache
+
+Each mode runs the hot order queries on one connection, inside a
+transaction that is rolled back, so the database is left untouched.
+"pgbouncer" parses and plans every statement again, as the old hardcoded
+prepared_statement_cache_size=0 did.
+"""
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.database import engine_connect_args
+from app.models.models import User
+from app.repositories.order import OrderRepository
+from app.schemas.order_schemas import OrderCreate
+
+ROUNDS = 2000
+
+
+async def run(mode: str) -> dict[str, float]:
+    engine = create_async_engine(
+        settings.database_url,
+        pool_size=1,
+        connect_args=engine_connect_args(mode, settings.db_statement_cache_size),
+    )
+    timings: dict[str, float] = {}
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        session = AsyncSession(bind=conn)
+        user_id = await session.scalar(
+            insert(User)
+            .values(email=f"bench-{uuid.uuid4()}@example.com", hashed_password="x")
+            .returning(User.id)
+        )
+        repo = OrderRepository(session)
+        orders = await repo.create_orders(
+            user_id, [OrderCreate(items=[{"sku": "item1", "qty": 1, "unit_price": 10}])] * 100
+        )
+        ids = [order.id for order in orders]
+
+        queries = {
+            "get_order": lambda: repo.get_order(ids[0]),
+            "get_orders": lambda: repo.get_orders(ids[:20]),
+            "get_order_user": lambda: repo.get_order_user(user_id, limit=50),
+        }
+        for name, query in queries.items():
+            await query()
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                await query()
+                session.expunge_all()
+            timings[name] = (time.perf_counter() - started) / ROUNDS * 1e6
+
+        await trans.rollback()
+    await engine.dispose()
+    return timings
+
+
+async def main() -> None:
+    results = {mode: await run(mode) for mode in ("pgbouncer", "direct")}
+    for name in results["direct"]:
+        uncached, cached = results["pgbouncer"][name], results["direct"][name]
+        print(f"{name:16} pgbouncer {uncached:8.1f} us  direct {cached:8.1f} us"
+              f"  saved {uncached - cached:6.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
 import asyncio
+from contextlib import nullcontext
 
 import pytest
 from httpx import AsyncClient
@@ -8,8 +9,8 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy_utils import create_database, database_exists
 
 from app.core import config
-from app.core.database import Base, engine
-from app.core.dependencies import get_current_user, get_db
+from app.core.database import Base, engine, read_session_factory
+from app.core.dependencies import get_current_user, get_db, get_read_db
 from app.core.redis_init import rdb
 from app.main import app
 from app.schemas.auth_schemas import UserContext
@@ -46,6 +47,8 @@ async def db_session():
 @pytest.fixture(autouse=True)
 def override_db(db_session):
     app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_read_db] = lambda: db_session
+    app.dependency_overrides[read_session_factory] = lambda: lambda: nullcontext(db_session)
 
 @pytest.fixture
 async def auth_headers(ac):
@@ -88,8 +91,8 @@ async def clean_rdb(test_rdb):
 
 @pytest.fixture
 def order_payload():
-    return {"items": "string", "total_price": 50.0}
+    return {"items": [{"sku": "string", "qty": 1, "unit_price": 50.0}]}
 
 @pytest.fixture
 def patch_payload():
-    return {"items": "new", "total_price": 100.0, "status": OrderStatus.PAID}
+    return {"items": [{"sku": "new", "qty": 2, "unit_price": 50.0}], "status": OrderStatus.PAID}
@@ -1,11 +1,25 @@
+import importlib.util
+import json
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
 import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
 
+from app.api.orders import get_export_service
+from app.main import app
 from app.models.models import Order
+from app.repositories.order import OrderRepository
+from app.schemas.order_schemas import OrderSearch, OrderStatus
+from app.services.export_service import OrderExportService
 
 
 @pytest.mark.asyncio
 async def test_order_process(clean_rdb, auth_headers, ac):
-        payload = {"items": "item1", "total_price": 100.0, "user_id": 1}
+        payload = {"items": [{"sku": "item1", "qty": 1, "unit_price": 100.0}], "user_id": 1}
         # Create
         resp = await ac.post("/orders/", json=payload, headers=auth_headers)
         assert resp.status_code == 201
@@ -50,5 +64,171 @@ async def test_get_order_user_db_and_cache(ac, db_session, auth_headers, test_rd
     user_id = 1
     resp = await ac.get(f"/orders/user/{user_id}", headers=auth_headers)
     assert resp.status_code == 200
-    assert resp.json()[0]["items"] == order_payload["items"]
+    assert resp.json()["items"][0]["items"] == order_payload["items"]
+
+
+@pytest.mark.asyncio
+async def test_get_order_user_pagination(ac, db_session, auth_headers, order_payload):
+    for _ in range(3):
+        await ac.post("/orders/", json=order_payload, headers=auth_headers)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        resp = await ac.get("/orders/user/1", params=params, headers=auth_headers)
+        assert resp.status_code == 200
+        page = resp.json()
+        seen += [order["id"] for order in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 3
+
+@pytest.mark.asyncio
+async def test_export_orders_ndjson(ac, db_session, auth_headers, order_payload):
+    # Share the uncommitted test session instead of opening a new one
+    app.dependency_overrides[get_export_service] = lambda: OrderExportService(
+        session_factory=lambda: nullcontext(db_session)
+    )
+    await ac.post("/orders/", json=order_payload, headers=auth_headers)
+
+    resp = await ac.get("/orders/export", params={"user_id": 1}, headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = resp.text.splitlines()
+    assert len(rows) == 1
+    assert json.loads(rows[0])["items"] == order_payload["items"]
+
+@pytest.mark.asyncio
+async def test_create_orders_batch(ac, db_session, auth_headers, order_payload):
+    payload = {"orders": [order_payload, {"items": "x"}, order_payload]}
+    resp = await ac.post("/orders/batch", json=payload, headers=auth_headers)
+    assert resp.status_code == 201
+    results = resp.json()["results"]
+    assert [item["ok"] for item in results] == [True, False, True]
+
+    resp = await ac.get(f"/orders/{results[0]['order']['id']}/", headers=auth_headers)
+    assert resp.status_code == 200
+
+@pytest.mark.asyncio
+async def test_get_orders_by_ids(ac, db_session, auth_headers, order_payload):
+    c_res = await ac.post("/orders/", json=order_payload, headers=auth_headers)
+    order_id = c_res.json()["id"]
+    missing = "00000000-0000-0000-0000-000000000000"
+
+    resp = await ac.get("/orders/", params={"ids": f"{missing},{order_id}"}, headers=auth_headers)
+    assert resp.status_code == 200
+    assert [item["found"] for item in resp.json()] == [False, True]
+
+@pytest.mark.asyncio
+async def test_order_counts_follow_writes(ac, db_session, auth_headers, order_payload, patch_payload):
+    for _ in range(3):
+        c_res = await ac.post("/orders/", json=order_payload, headers=auth_headers)
+    await ac.patch(f"/orders/{c_res.json()['id']}", json=patch_payload, headers=auth_headers)
+
+    resp = await ac.get("/orders/counts", params={"user_id": 1}, headers=auth_headers)
+    assert resp.json() == {"count": 3, "exact": True}
+    resp = await ac.get("/orders/counts", params={"user_id": 1, "status": "PAID"}, headers=auth_headers)
+    assert resp.json()["count"] == 1
+    resp = await ac.get("/orders/counts", headers=auth_headers)
+    assert resp.json() == {"count": 3, "exact": True}
+    resp = await ac.get("/orders/counts", params={"status": "PENDING"}, headers=auth_headers)
+    assert resp.json()["count"] == 2
+
+    resp = await ac.get("/orders/user/1", headers=auth_headers)
+    assert resp.headers["X-Total-Count"] == "3"
+
+    resp = await ac.get("/orders/counts", params={"exact": "false"}, headers=auth_headers)
+    assert resp.json()["exact"] is False
+
+@pytest.mark.asyncio
+async def test_search_orders(ac, db_session, auth_headers, order_payload, patch_payload):
+    for _ in range(3):
+        c_res = await ac.post("/orders/", json=order_payload, headers=auth_headers)
+    await ac.patch(f"/orders/{c_res.json()['id']}", json=patch_payload, headers=auth_headers)
+
+    resp = await ac.get("/orders/search", params={"status": "PENDING", "limit": 1}, headers=auth_headers)
+    assert resp.status_code == 200
+    page = resp.json()
+    resp = await ac.get(
+        "/orders/search",
+        params={"status": "PENDING", "limit": 1, "cursor": page["next_cursor"]},
+        headers=auth_headers,
+    )
+    assert resp.json()["items"][0]["id"] != page["items"][0]["id"]
+
+    resp = await ac.get("/orders/search", params={"status": ["PENDING", "PAID"]}, headers=auth_headers)
+    assert len(resp.json()["items"]) == 3
+    resp = await ac.get("/orders/search", params={"price_min": 60}, headers=auth_headers)
+    assert [order["status"] for order in resp.json()["items"]] == ["PAID"]
+    resp = await ac.get("/orders/search", params={"created_from": "2026-10-18T00:00:00"}, headers=auth_headers)
+    assert resp.status_code == 422
+    resp = await ac.get("/orders/search", params={"older_than": 900}, headers=auth_headers)
+    assert resp.json()["items"] == []
+    resp = await ac.get("/orders/search", params={"sku": "new"}, headers=auth_headers)
+    assert [order["total_price"] for order in resp.json()["items"]] == [100.0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "search",
+    [
+        OrderSearch(statuses=[OrderStatus.PENDING], created_to=datetime.now(timezone.utc)),
+        OrderSearch(statuses=[OrderStatus.PENDING, OrderStatus.PAID]),
+        OrderSearch(user_id=1, created_from=datetime.now(timezone.utc) - timedelta(days=1)),
+        OrderSearch(sku="item1"),
+    ],
+)
+async def test_search_plan_uses_indexes(db_session, search):
+    # Tiny tables are cheapest to scan; forbid that to see which indexes fit
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    query = OrderRepository(db_session).search_query(search, limit=51)
+    sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+
+    plan = "\n".join((await db_session.execute(text(f"EXPLAIN {sql}"))).scalars())
+
+    assert "Seq Scan" not in plan
+    assert "Index" in plan
+
+
+@pytest.mark.asyncio
+async def test_metrics_require_auth(ac, auth_headers):
+    resp = await ac.get("/metrics/")
+    assert resp.status_code == 401
+
+    resp = await ac.get("/metrics/", headers=auth_headers)
+    assert resp.status_code == 200
+    assert "order_l1" in resp.json()
+
+def _migration(name):
+    path = Path(__file__).parents[2] / "alembic" / "versions" / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.mark.asyncio
+async def test_items_migration_converts_legacy_values(db_session, auth_headers):
+    migration = _migration("d2a9f7c31e84_structured_order_items")
+    legacy = {uuid.uuid4(): "{}", uuid.uuid4(): '"item1, item2,item1"', uuid.uuid4(): '""'}
+    for order_id, items in legacy.items():
+        await db_session.execute(
+            text(
+                "INSERT INTO orders (id, user_id, items, total_price, status, created_at)"
+                " VALUES (:id, 1, CAST(:items AS jsonb), 0, 'PENDING', now())"
+            ),
+            {"id": order_id, "items": items},
+        )
+
+    await db_session.execute(text(migration.ITEMS_TO_LINES))
 
+    rows = dict((await db_session.execute(text("SELECT id, items FROM orders"))).all())
+    empty, lines, blank = legacy
+    assert rows[empty] == []
+    assert rows[lines] == [
+        {"sku": "item1", "qty": 2, "unit_price": 0},
+        {"sku": "item2", "qty": 1, "unit_price": 0},
+    ]
+    assert rows[blank] == []
@@ -1,8 +1,10 @@
 import uuid
+from contextlib import nullcontext
 from datetime import datetime
 from decimal import Decimal
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
+import fakeredis
 import fakeredis.aioredis
 import pytest
 
@@ -13,39 +15,56 @@ from app.schemas.auth_schemas import LoginRequest
 from app.schemas.order_schemas import OrderCreate, OrderResponse, OrderStatus
 from app.services.auth_service import AuthService
 from app.services.jwt_services import JWTService
-from app.services.order_service import OrderService
+from app.services.order_service import OrderService, order_l1
+from app.services.user_cache import UserCache
 
 
 @pytest.fixture
 def order_repo():
+    repo = AsyncMock()
+    repo.session = MagicMock(info={})
+    repo.count_orders.return_value = 1
+    return repo
+
+@pytest.fixture
+def outbox_repo():
     return AsyncMock()
 
 @pytest.fixture
-def order_service(order_repo, fake_rdb):
-    return OrderService(order_repo)
+def order_service(mocker, order_repo, outbox_repo, fake_rdb):
+    # Fills open their own session; route them to the same mocked repository
+    mocker.patch("app.services.order_service.OrderRepository", return_value=order_repo)
+    return OrderService(order_repo, outbox_repo, fill_sessions=lambda: nullcontext(order_repo.session))
+
+@pytest.fixture
+def session_factory():
+    session = MagicMock()
+    session.begin.return_value = nullcontext()
+    return lambda: nullcontext(session)
 
 @pytest.fixture
 def order_create_data():
     return OrderCreate(
-        items="item1,item2",
-        total_price=100,
+        items=[
+            {"sku": "item1", "qty": 2, "unit_price": "25.00"},
+            {"sku": "item2", "qty": 1, "unit_price": "50.00"},
+        ],
         status=OrderStatus.PENDING,
     )
 
 @pytest.fixture
 def order_update_data(order_create_data):
-    return OrderCreate(
-        items="item1,item2",
-        total_price=100,
-        status=OrderStatus.PAID,
-    )
+    return order_create_data.model_copy(update={"status": OrderStatus.PAID})
 
 @pytest.fixture
 def order_model(order_id):
     order = OrderResponse(
         id=order_id,
         user_id=1,
-        items="item1,item2",
+        items=[
+            {"sku": "item1", "qty": 2, "unit_price": "25.00"},
+            {"sku": "item2", "qty": 1, "unit_price": "50.00"},
+        ],
         total_price=Decimal("100.00"),
         status=OrderStatus.PENDING,
         created_at=datetime.now(),
@@ -77,10 +96,27 @@ def mock_order_user(order_model):
 
 # cache
 
+@pytest.fixture(autouse=True)
+def clear_order_l1():
+    order_l1.clear()
+    yield
+    order_l1.clear()
+
 @pytest.fixture
-async def fake_rdb(mocker):
-    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+def fake_redis_server():
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+async def fake_rdb(mocker, fake_redis_server, fake_cache_rdb):
+    client = fakeredis.aioredis.FakeRedis(server=fake_redis_server, decode_responses=True)
     mocker.patch("app.services.order_service.rdb", client)
+    mocker.patch("app.services.user_cache.rdb", client)
+    return client
+
+@pytest.fixture
+async def fake_cache_rdb(mocker, fake_redis_server):
+    client = fakeredis.aioredis.FakeRedis(server=fake_redis_server)
+    mocker.patch("app.services.order_service.cache_rdb", client)
     return client
 
 # auth
@@ -89,6 +125,16 @@ async def fake_rdb(mocker):
 def jwt_service():
     return JWTService()
 
+@pytest.fixture
+def access_token(jwt_service):
+    return jwt_service.create_token_pair(user_id=1)["access_token"]
+
+@pytest.fixture
+def user_cache(fake_rdb, mocker):
+    cache = UserCache(maxsize=10, ttl=60, redis_ttl=60)
+    mocker.patch("app.core.dependencies.user_cache", cache)
+    return cache
+
 @pytest.fixture
 def mock_user_repo_none():
     repo = AsyncMock(spec=UserRepository)
@@ -1,15 +1,76 @@
+import asyncio
+import csv
+import io
 import json
-from unittest.mock import patch
+import threading
+import uuid
+from concurrent.futures import Future
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import jwt
 import pytest
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.util import greenlet_spawn
 
-from app.schemas.auth_schemas import LoginRequest
-from app.schemas.order_schemas import OrderStatus
+from app.api.orders import get_export_service
+from app.core.database import (
+    AsyncSessionLocal,
+    InstrumentedPool,
+    engine_connect_args,
+    get_db,
+    get_read_db,
+    pool_budget,
+    read_session_factory,
+    run_after_commit,
+)
+from app.core.dependencies import get_current_user
+from app.core.partitions import (
+    add_months,
+    create_partition_sql,
+    ensure_partitions,
+    expire_partitions,
+    partition_month,
+)
+from app.core.replicas import ReplicaRouter, mark_client_write
+from app.kafka.consumer import OffsetTracker, process_batch
+from app.kafka.outbox_relay import relay_once
+from app.repositories.order import OrderRepository
+from app.schemas.auth_schemas import LoginRequest, TokenType, UserContext
+from app.schemas.order_schemas import (
+    ExportFormat,
+    OrderCreate,
+    OrderPage,
+    OrderResponse,
+    OrderSearch,
+    OrderStatus,
+)
+from app.services import jwt_services
+from app.services.cache import JsonCodec, MsgpackCodec, TTLCache, make_codec, should_refresh_early
+from app.services.export_service import CSV_COLUMNS, OrderExportService
+from app.services.order_processor import OrderProcessor
+from app.services.order_service import (
+    ORDER_INVALIDATION_CHANNEL,
+    RELEASE_LOCK_SCRIPT,
+    OrderService,
+    _worker_token,
+    handle_order_invalidation,
+    invalidate_order,
+    new_order_event,
+    order_codec,
+    order_l1,
+)
+from app.utils.executor import BoundedExecutor, ExecutorSaturatedError
+from app.utils.pagination import decode_cursor
 
 
 @pytest.mark.asyncio
-async def test_create_order(order_service, order_repo, order_create_data, order_model):
+async def test_create_order(order_service, order_repo, outbox_repo, order_create_data, order_model):
     order_repo.create_order.return_value = order_model
 
     result = await order_service.create_order(
@@ -18,11 +79,81 @@ async def test_create_order(order_service, order_repo, order_create_data, order_
     )
 
     order_repo.create_order.assert_awaited_once()
+    outbox_repo.add_events.assert_awaited_once_with("orders", [new_order_event(order_model.id)])
     assert result.user_id == 1
     assert result.items == order_create_data.items
     assert result.status == OrderStatus.PENDING
 
 
+@pytest.mark.asyncio
+async def test_create_orders_batch(order_service, order_repo, outbox_repo, order_model):
+    order_repo.create_orders.return_value = [order_model]
+
+    result = await order_service.create_orders(
+        data=[
+            {"items": "item1", "total_price": 100},
+            {"items": [{"sku": "item1", "qty": 3, "unit_price": 1.5}], "total_price": 999},
+        ],
+        user_id=1,
+    )
+
+    created = order_repo.create_orders.await_args.kwargs["orders"][0]
+    assert created.items[0].sku == "item1"
+    assert created.total_price == Decimal("4.50")
+    assert [item.ok for item in result.results] == [False, True]
+    assert result.results[1].order.id == order_model.id
+    outbox_repo.add_events.assert_awaited_once_with("orders", [new_order_event(order_model.id)])
+
+
+@pytest.mark.asyncio
+async def test_create_writes_through_cache(order_service, fake_cache_rdb, order_repo, order_create_data, order_model):
+    order_repo.create_order.return_value = order_model
+    order_repo.create_orders.return_value = [order_model]
+
+    await order_service.create_order(data=order_create_data, user_id=1)
+    await run_after_commit(order_repo.session)
+    assert order_codec.loads(await fake_cache_rdb.get(f"order:{order_model.id}")) == order_model
+
+    await fake_cache_rdb.flushall()
+    await order_service.create_orders(data=[order_create_data.model_dump()], user_id=1)
+    await run_after_commit(order_repo.session)
+    assert order_codec.loads(await fake_cache_rdb.get(f"order:{order_model.id}")) == order_model
+
+    order_l1.clear()
+    await order_service.get_order(order_model.id)
+    order_repo.get_order.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_create_rolled_back_is_not_cached(mocker, order_service, fake_cache_rdb, order_repo, order_create_data, order_model):
+    session = MagicMock(info={}, rollback=AsyncMock(), close=AsyncMock())
+    session.commit = AsyncMock(side_effect=sa_exc.OperationalError("COMMIT", {}, Exception("deadlock")))
+    mocker.patch("app.core.database.AsyncSessionLocal", lambda: nullcontext(session))
+    order_repo.session = session
+    order_repo.create_order.return_value = order_model
+    order_l1.clear()
+
+    db = get_db(MagicMock(headers={}))
+    await anext(db)
+    await order_service.create_order(data=order_create_data, user_id=1)
+    with pytest.raises(sa_exc.OperationalError):
+        await anext(db)
+
+    session.rollback.assert_awaited_once()
+    assert await fake_cache_rdb.get(f"order:{order_model.id}") is None
+    assert order_l1.get(order_model.id) is None
+
+
+@pytest.mark.asyncio
+async def test_create_orders_batch_too_large(mocker, order_service):
+    mocker.patch("app.services.order_service.settings.orders_batch_max", 1)
+
+    with pytest.raises(HTTPException) as exc:
+        await order_service.create_orders(data=[{}, {}], user_id=1)
+
+    assert exc.value.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_patch_order(order_service, order_repo, order_update_data, order_model_patch, order_id):
     order_repo.update_order.return_value = order_model_patch
@@ -38,6 +169,336 @@ async def test_patch_order(order_service, order_repo, order_update_data, order_m
     assert result.status == OrderStatus.PAID
 
 
+@pytest.mark.asyncio
+async def test_patch_order_not_found(order_service, order_repo, order_update_data, order_id):
+    order_repo.update_order.return_value = None
+
+    with pytest.raises(HTTPException) as exc:
+        await order_service.patch_order(data=order_update_data, order_id=order_id)
+
+    assert exc.value.status_code == 404
+    order_repo.get_order.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_repository_writes_use_returning(order_create_data, order_update_data, order_id):
+    session = AsyncMock()
+    session.scalars.return_value = MagicMock()
+    repo = OrderRepository(session)
+
+    await repo.create_order(user_id=1, order=order_create_data)
+    await repo.update_order(order_id, order_update_data)
+
+    insert, update = (call.args[0] for call in session.scalars.await_args_list)
+    insert_sql, update_sql = (str(stmt.compile(dialect=postgresql.dialect())) for stmt in (insert, update))
+    assert insert_sql.startswith("INSERT INTO orders") and "RETURNING" in insert_sql
+    assert update_sql.startswith("UPDATE orders SET") and "RETURNING" in update_sql
+    assert "total_price" in update_sql
+    params = insert.compile().params
+    assert params["total_price"] == Decimal("100.00")
+    assert params["items"][0] == {"sku": "item1", "qty": 2, "unit_price": 25.0}
+    session.flush.assert_not_awaited()
+    session.refresh.assert_not_awaited()
+
+
+def test_engine_connect_args():
+    assert engine_connect_args("direct", 500) == {"prepared_statement_cache_size": 500}
+
+    pooled = engine_connect_args("pgbouncer", 500)
+    assert pooled["prepared_statement_cache_size"] == 0
+    assert pooled["statement_cache_size"] == 0
+    assert pooled["prepared_statement_name_func"]() != pooled["prepared_statement_name_func"]()
+
+    with pytest.raises(ValueError):
+        engine_connect_args("session", 500)
+
+
+def test_replica_router_round_robin_and_fallback():
+    router = ReplicaRouter([MagicMock(), MagicMock(), MagicMock()], max_lag=5)
+    assert router.pick() is None
+
+    router.lags = [0.1, 30.0, 2.0]
+    picked = [router.pick() for _ in range(4)]
+    assert picked == [router.sessionmakers[0], router.sessionmakers[2]] * 2
+
+    router.lags = [None, 30.0, None]
+    assert router.pick() is None
+    assert router.fallbacks == 2
+
+
+def test_replica_router_without_replicas_counts_no_fallback():
+    router = ReplicaRouter([], max_lag=5)
+
+    assert router.pick() is None
+    assert router.fallbacks == 0
+
+
+@pytest.mark.asyncio
+async def test_replica_router_failed_lag_check_takes_replica_out():
+    engine = MagicMock()
+    engine.connect.side_effect = OSError("connection refused")
+    router = ReplicaRouter([engine], max_lag=5)
+    router.lags = [0.0]
+
+    await router.check_lag(timeout=1)
+
+    assert router.lags == [None]
+
+
+@pytest.mark.asyncio
+async def test_read_db_sticks_to_primary_after_write(mocker, fake_rdb):
+    mocker.patch("app.core.replicas.rdb", fake_rdb)
+    replica_session, primary_session = MagicMock(), MagicMock()
+    router = ReplicaRouter([MagicMock()], max_lag=5)
+    router.lags = [0.0]
+    router.sessionmakers = [lambda: nullcontext(replica_session)]
+    mocker.patch("app.core.database.replicas", router)
+    mocker.patch("app.core.database.AsyncSessionLocal", lambda: nullcontext(primary_session))
+    request = MagicMock(headers={"authorization": "Bearer abc"})
+
+    assert await anext(get_read_db(await read_session_factory(request))) is replica_session
+    await mark_client_write(request)
+    assert await anext(get_read_db(await read_session_factory(request))) is primary_session
+
+
+@pytest.mark.asyncio
+async def test_export_service_sticks_to_primary_after_write(mocker, fake_rdb):
+    mocker.patch("app.core.replicas.rdb", fake_rdb)
+    router = ReplicaRouter([MagicMock()], max_lag=5)
+    router.lags = [0.0]
+    mocker.patch("app.core.database.replicas", router)
+    request = MagicMock(headers={"authorization": "Bearer abc"})
+
+    assert (await get_export_service(request)).session_factory is router.sessionmakers[0]
+    await mark_client_write(request)
+    assert (await get_export_service(request)).session_factory is AsyncSessionLocal
+
+
+def test_pool_budget():
+    assert pool_budget(800, 8) == (50, 50)
+    assert pool_budget(10, 1) == (5, 5)
+    assert pool_budget(3, 2) == (1, 0)
+
+    with pytest.raises(ValueError):
+        pool_budget(4, 8)
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_counts_timeouts():
+    def checkout():
+        pool = InstrumentedPool(creator=MagicMock, pool_size=1, max_overflow=0, timeout=0.01)
+        conn = pool.connect()
+        with pytest.raises(sa_exc.TimeoutError):
+            pool.connect()
+        conn.close()
+        return pool.stats()
+
+    stats = await greenlet_spawn(checkout)
+
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 10
+
+
+@pytest.mark.asyncio
+async def test_service_count_orders(order_service, order_repo, user_id):
+    order_repo.count_orders.return_value = 7
+    order_repo.estimate_count.return_value = 9000
+
+    exact = await order_service.count_orders(user_id=user_id, status=OrderStatus.PAID)
+    approx = await order_service.count_orders(status=OrderStatus.PAID, exact=False)
+
+    assert (exact.count, exact.exact) == (7, True)
+    order_repo.count_orders.assert_awaited_once_with(user_id=user_id, status=OrderStatus.PAID)
+    assert (approx.count, approx.exact) == (9000, False)
+    order_repo.estimate_count.assert_awaited_once_with({"user_id": None, "status": "PAID"})
+
+
+@pytest.mark.asyncio
+async def test_estimate_count_reads_planner_statistics():
+    session = AsyncMock()
+    session.execute.return_value = MagicMock(scalar_one=MagicMock(return_value=[{"Plan": {"Plan Rows": 42}}]))
+    repo = OrderRepository(session)
+
+    assert await repo.estimate_count({"status": "PAID", "unknown": 1}) == 42
+    sql = str(session.execute.await_args.args[0])
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "orders.status = 'PAID'" in sql
+
+    session.execute.return_value = MagicMock(scalar_one=MagicMock(return_value=1000))
+    assert await repo.estimate_count() == 1000
+    assert "reltuples" in str(session.execute.await_args.args[0])
+
+
+@pytest.mark.asyncio
+async def test_count_orders_sums_per_user_rows():
+    session = AsyncMock()
+    session.execute.return_value = MagicMock(scalar_one=MagicMock(return_value=3))
+    repo = OrderRepository(session)
+
+    assert await repo.count_orders(user_id=7) == 3
+    assert "order_counts.user_id = 7" in _sql(session.execute.await_args.args[0])
+
+    await repo.count_orders(status=OrderStatus.PAID)
+    sql = _sql(session.execute.await_args.args[0])
+    assert "user_id" not in sql
+    assert "order_counts.status = 'PAID'" in sql
+
+
+def _sql(query):
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_search_query_is_index_friendly(order_id):
+    repo = OrderRepository(AsyncMock())
+    cutoff = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+    sql = _sql(repo.search_query(OrderSearch(statuses=[OrderStatus.PENDING], created_to=cutoff), 51))
+    assert "orders.status = 'PENDING'" in sql
+    assert "orders.created_at < '2026-10-18 00:00:00+00:00'" in sql
+    assert sql.endswith("ORDER BY orders.created_at DESC, orders.id DESC \n LIMIT 51")
+
+    search = OrderSearch(statuses=[OrderStatus.PAID, OrderStatus.PENDING], price_max=10)
+    sql = _sql(repo.search_query(search, 51, after=(cutoff, order_id)))
+    assert sql.count("UNION ALL") == 1
+    assert sql.count("LIMIT 51") == 3
+    assert sql.count(f"orders.id < '{order_id}'") == 2
+    assert "orders.total_price <= 10" in sql
+
+    sql = _sql(repo.search_query(OrderSearch(sku="A'1"), 51))
+    assert """orders.items @> CAST('[{"sku": "A''1"}]' AS JSONB)""" in sql
+
+    sql = _sql(repo.search_query(search.model_copy(update={"user_id": 7}), 51))
+    assert "UNION" not in sql
+    assert "orders.user_id = 7" in sql
+    assert "orders.status IN ('PAID', 'PENDING')" in sql
+
+
+@pytest.mark.asyncio
+async def test_search_orders_pages_and_folds_older_than(order_service, order_repo, order_model):
+    order_repo.search_orders.return_value = [order_model, order_model]
+    started = datetime.now(timezone.utc)
+
+    page = await order_service.search_orders(
+        OrderSearch(statuses=[OrderStatus.PENDING], older_than=timedelta(minutes=15)), limit=1
+    )
+
+    assert len(page.items) == 1
+    assert decode_cursor(page.next_cursor)[1] == order_model.id
+    search = order_repo.search_orders.await_args.args[0]
+    assert search.older_than is None
+    assert search.created_to <= started - timedelta(minutes=15) + timedelta(seconds=5)
+    assert order_repo.search_orders.await_args.kwargs["limit"] == 2
+
+
+@pytest.mark.asyncio
+async def test_search_orders_rejects_empty_ranges(order_service):
+    moment = datetime(2026, 10, 18, tzinfo=timezone.utc)
+    for search in [
+        OrderSearch(created_from=moment, created_to=moment),
+        OrderSearch(price_min=10, price_max=5),
+    ]:
+        with pytest.raises(HTTPException) as exc:
+            await order_service.search_orders(search)
+        assert exc.value.status_code == 400
+
+
+def test_order_search_filters_are_aware_and_exact():
+    search = OrderSearch(price_min="0.10", price_max=60)
+    assert search.price_min == Decimal("0.10")
+    assert isinstance(search.price_max, Decimal)
+
+    for bad in [
+        {"created_from": datetime(2026, 10, 18)},
+        {"created_to": "2026-10-18T00:00:00"},
+        {"price_min": "0.001"},
+        {"price_max": -1},
+    ]:
+        with pytest.raises(ValidationError):
+            OrderSearch(**bad)
+
+
+def test_order_items_validated_and_total_computed():
+    order = OrderCreate(
+        items=[
+            {"sku": "A-1", "qty": 3, "unit_price": "0.10"},
+            {"sku": "B-2", "qty": 1, "unit_price": 19.99},
+        ],
+        total_price=1,
+    )
+    assert order.total_price == Decimal("20.29")
+
+    for items in [
+        [],
+        "item1,item2",
+        [{"sku": "A-1", "qty": 0, "unit_price": 1}],
+        [{"sku": "A-1", "qty": 1, "unit_price": "0.001"}],
+        [{"sku": "A-1", "qty": 20, "unit_price": "9999999.99"}],
+    ]:
+        with pytest.raises(ValidationError):
+            OrderCreate(items=items)
+
+
+def test_partition_months():
+    month = datetime(2026, 12, 1, tzinfo=timezone.utc)
+
+    assert add_months(month, 1) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert add_months(month, -12) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert partition_month("orders_y2026m12") == month
+    assert partition_month("orders_default") is None
+    assert create_partition_sql(month) == (
+        "CREATE TABLE IF NOT EXISTS orders_y2026m12 PARTITION OF orders"
+        " FOR VALUES FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')"
+    )
+
+
+def _partition_conn(partitions, stranded=False):
+    conn = AsyncMock()
+    conn.execute.return_value = MagicMock(scalars=MagicMock(return_value=partitions))
+    conn.scalar.return_value = stranded
+    return conn
+
+
+def _executed(conn):
+    return [str(call.args[0]) for call in conn.execute.await_args_list]
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_missing_months():
+    conn = _partition_conn(["orders_default", "orders_y2026m10"])
+    now = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+    created = await ensure_partitions(conn, months_ahead=2, now=now)
+
+    assert created == ["orders_y2026m11", "orders_y2026m12"]
+    assert "pg_advisory_xact_lock" in _executed(conn)[0]
+    assert _executed(conn)[-1] == create_partition_sql(datetime(2026, 12, 1, tzinfo=timezone.utc))
+
+    stranded = _partition_conn([], stranded=True)
+    assert await ensure_partitions(stranded, months_ahead=0, now=now) == []
+
+
+@pytest.mark.asyncio
+async def test_expire_partitions_uncounts_then_detaches():
+    conn = _partition_conn(["orders_default", "orders_y2026m06", "orders_y2026m07"])
+    now = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+    assert await expire_partitions(conn, retention_months=0, drop=True, now=now) == []
+    conn.execute.assert_not_awaited()
+
+    expired = await expire_partitions(conn, retention_months=3, drop=True, now=now)
+
+    assert expired == ["orders_y2026m06"]
+    statements = _executed(conn)[2:]
+    assert statements[0] == "LOCK TABLE orders_y2026m06 IN SHARE MODE"
+    assert statements[1].startswith("UPDATE order_counts")
+    assert statements[2:] == [
+        "ALTER TABLE orders DETACH PARTITION orders_y2026m06",
+        "DROP TABLE orders_y2026m06",
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_order_success(order_service, order_repo, order_model, order_id):
     order_repo.get_order.return_value = order_model
@@ -60,12 +521,37 @@ async def test_get_order_not_found(order_service, order_repo, order_id):
 async def test_get_order_user_success(order_service, order_repo, mock_order_user, user_id):
     order_repo.get_order_user.return_value = mock_order_user
     result = await order_service.get_order_user(user_id)
-    assert result[0].user_id == user_id
+    assert result.total == 1
+    assert result.items[0].user_id == user_id
+    assert result.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_get_order_user_next_cursor(order_service, order_repo, order_model, user_id):
+    order_repo.get_order_user.return_value = [order_model, order_model]
+    result = await order_service.get_order_user(user_id, limit=1)
+
+    order_repo.get_order_user.assert_awaited_once_with(user_id=user_id, limit=2, after=None)
+    assert len(result.items) == 1
+    assert decode_cursor(result.next_cursor) == (order_model.created_at, order_model.id)
+
+    await order_service.get_order_user(user_id, limit=1, cursor=result.next_cursor)
+    assert order_repo.get_order_user.await_args.kwargs["after"] == (
+        order_model.created_at, order_model.id
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_order_user_invalid_cursor(order_service, user_id):
+    with pytest.raises(HTTPException) as exc:
+        await order_service.get_order_user(user_id, cursor="not-a-cursor")
+
+    assert exc.value.status_code == 400
 
 
 @pytest.mark.asyncio
 async def test_get_order_user_not_found(order_service, order_repo, user_id):
-    order_repo.get_order.return_value = None
+    order_repo.get_order_user.return_value = []
 
     with pytest.raises(HTTPException) as exc:
         await order_service.get_order_user(user_id=user_id)
@@ -73,6 +559,172 @@ async def test_get_order_user_not_found(order_service, order_repo, user_id):
     assert exc.value.status_code == 404
     assert f"No orders for user {user_id}" in exc.value.detail
 
+# outbox
+
+@pytest.mark.asyncio
+async def test_outbox_relay_publishes_and_deletes(mocker, session_factory):
+    events = [
+        MagicMock(id=1, topic="orders", payload={"n": 1}),
+        MagicMock(id=2, topic="orders", payload={"n": 2}),
+    ]
+    repo = mocker.patch("app.kafka.outbox_relay.OutboxRepository").return_value
+    repo.claim_batch = AsyncMock(return_value=events)
+    repo.delete_events = AsyncMock()
+    send_batch = mocker.patch("app.kafka.outbox_relay.send_batch_to_kafka")
+
+    sent = await relay_once(session_factory=session_factory)
+
+    assert sent == 2
+    send_batch.assert_awaited_once_with("orders", [{"n": 1}, {"n": 2}])
+    repo.delete_events.assert_awaited_once_with([1, 2])
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_keeps_events_on_kafka_error(mocker, session_factory):
+    repo = mocker.patch("app.kafka.outbox_relay.OutboxRepository").return_value
+    repo.claim_batch = AsyncMock(return_value=[MagicMock(id=1, topic="orders", payload={})])
+    repo.delete_events = AsyncMock()
+    mocker.patch("app.kafka.outbox_relay.send_batch_to_kafka", side_effect=RuntimeError)
+
+    with pytest.raises(RuntimeError):
+        await relay_once(session_factory=session_factory)
+
+    repo.delete_events.assert_not_awaited()
+
+# kafka
+
+def _kafka_message(partition, value, offset=0):
+    msg = MagicMock()
+    msg.error.return_value = None
+    msg.topic.return_value = "orders"
+    msg.partition.return_value = partition
+    msg.offset.return_value = offset
+    msg.value.return_value = value
+    return msg
+
+
+def test_consumer_commits_contiguous_done_offsets(mocker):
+    first, second = Future(), Future()
+    mocker.patch("app.kafka.consumer.processor.submit", side_effect=[first, second])
+    dead_letter = mocker.patch("app.kafka.consumer.processor.submit_dead_letter", return_value=Future())
+    event = json.dumps({"event_type": "new_order", "data": {"id": "1"}}).encode()
+    other = json.dumps({"event_type": "other"}).encode()
+    tracker = OffsetTracker()
+
+    handled = process_batch([
+        _kafka_message(0, event, offset=10),
+        _kafka_message(0, event, offset=11),
+        _kafka_message(1, other, offset=5),
+        _kafka_message(1, b"not json", offset=6),
+    ], tracker)
+
+    assert handled == 4
+    dead_letter.assert_called_once()
+    assert [(tp.partition, tp.offset) for tp in tracker.committable()] == [(1, 6)]
+
+    second.set_result(True)
+    assert tracker.committable() == []
+    first.set_result(True)
+    assert [(tp.partition, tp.offset) for tp in tracker.committable()] == [(0, 12)]
+
+
+def test_consumer_does_not_commit_past_failed_order(mocker):
+    failed = Future()
+    mocker.patch("app.kafka.consumer.processor.submit", return_value=failed)
+    event = json.dumps({"event_type": "new_order", "data": {"id": "1"}}).encode()
+    tracker = OffsetTracker()
+
+    process_batch([_kafka_message(0, event, offset=3)], tracker)
+    failed.set_exception(RuntimeError("boom"))
+
+    assert tracker.committable() == []
+
+
+@pytest.mark.asyncio
+async def test_order_processor_marks_paid(mocker, session_factory, order_id):
+    mocker.patch("app.services.order_processor.settings.order_processing_seconds", 0)
+    repo = mocker.patch("app.services.order_processor.OrderRepository").return_value
+    repo.set_status = AsyncMock(return_value=1)
+    invalidate = mocker.patch("app.services.order_processor.invalidate_order")
+    processor = OrderProcessor(session_factory=session_factory, concurrency=2)
+
+    results = await asyncio.gather(*[processor.process({"id": str(order_id)}) for _ in range(3)])
+
+    assert results == [True, True, True]
+    repo.set_status.assert_awaited_with(order_id, OrderStatus.PENDING, OrderStatus.PAID)
+    invalidate.assert_awaited_with(order_id, 1)
+    assert processor.stats() == {"pending": 0, "in_flight": 0, "processed": 3, "retried": 0, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_order_processor_invalidates_already_paid(mocker, session_factory, order_id, order_model):
+    """A retry after a failed invalidation still drops the cached PENDING copy."""
+    mocker.patch("app.services.order_processor.settings.order_processing_seconds", 0)
+    repo = mocker.patch("app.services.order_processor.OrderRepository").return_value
+    repo.set_status = AsyncMock(return_value=None)
+    repo.get_order = AsyncMock(return_value=order_model)
+    invalidate = mocker.patch("app.services.order_processor.invalidate_order")
+    processor = OrderProcessor(session_factory=session_factory, concurrency=2)
+
+    assert await processor.process({"id": str(order_id)}) is True
+
+    invalidate.assert_awaited_once_with(order_id, order_model.user_id)
+
+
+@pytest.mark.asyncio
+async def test_order_processor_retries_then_dead_letters(mocker, session_factory, order_id):
+    mocker.patch("app.services.order_processor.settings.order_processing_seconds", 0)
+    mocker.patch("app.services.order_processor.settings.order_processing_retries", 2)
+    mocker.patch("app.services.order_processor.settings.order_processing_retry_backoff", 0)
+    repo = mocker.patch("app.services.order_processor.OrderRepository").return_value
+    repo.set_status = AsyncMock(side_effect=RuntimeError("db down"))
+    send = mocker.patch("app.services.order_processor.send_to_kafka", AsyncMock())
+    processor = OrderProcessor(session_factory=session_factory, concurrency=2)
+
+    assert await processor.process({"id": str(order_id)}) is False
+
+    assert repo.set_status.await_count == 3
+    send.assert_awaited_once_with("orders.dlq", {"payload": {"id": str(order_id)}, "error": "db down"})
+    assert processor.stats()["retried"] == 2
+    assert processor.stats()["failed"] == 1
+
+# export
+
+def _stream_of(orders):
+    async def stream_orders(**kwargs):
+        for order in orders:
+            yield order
+    return stream_orders
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_chunks(mocker, session_factory, order_model):
+    mocker.patch("app.services.export_service.settings.export_chunk_rows", 2)
+    repo = mocker.patch("app.services.export_service.OrderRepository").return_value
+    repo.stream_orders = _stream_of([order_model] * 3)
+    service = OrderExportService(session_factory=session_factory)
+
+    chunks = [chunk async for chunk in service.stream(ExportFormat.NDJSON, user_id=1)]
+
+    assert len(chunks) == 2
+    rows = b"".join(chunks).decode().splitlines()
+    assert len(rows) == 3
+    assert json.loads(rows[0])["id"] == str(order_model.id)
+
+
+@pytest.mark.asyncio
+async def test_export_csv_has_header(mocker, session_factory, order_model):
+    repo = mocker.patch("app.services.export_service.OrderRepository").return_value
+    repo.stream_orders = _stream_of([order_model])
+    service = OrderExportService(session_factory=session_factory)
+
+    body = b"".join([chunk async for chunk in service.stream(ExportFormat.CSV, user_id=1)])
+
+    header, row = csv.reader(io.StringIO(body.decode()))
+    assert header == CSV_COLUMNS
+    assert row[0] == str(order_model.id)
+    assert json.loads(row[CSV_COLUMNS.index("items")])[0] == {"sku": "item1", "qty": 2, "unit_price": 25.0}
+
 # cache
 
 @pytest.mark.asyncio
@@ -104,15 +756,235 @@ async def test_service_get_order_cache_miss(order_service, fake_rdb, order_repo,
 @pytest.mark.asyncio
 async def test_service_patch_updates_cache(order_service, fake_rdb, order_repo, order_model_patch, order_update_data, order_id):
     """Confirms that updating an order via the service
-    also refreshes the corresponding record in the cache."""
+    also refreshes the corresponding record in the cache, once committed."""
     order_repo.update_order.return_value = order_model_patch
 
     await order_service.patch_order(order_id, order_update_data)
+    assert await fake_rdb.get(f"order:{order_id}") is None
 
+    await run_after_commit(order_repo.session)
     cached = await fake_rdb.get(f"order:{order_id}")
     assert json.loads(cached)["status"] == OrderStatus.PAID
 
 
+@pytest.mark.asyncio
+async def test_service_get_order_l1_hit(order_service, fake_rdb, order_repo, order_model, order_id):
+    """Second read is served from the worker's L1 without touching Redis."""
+    order_repo.get_order.return_value = order_model
+
+    first = await order_service.get_order(order_id)
+    await fake_rdb.flushall()
+    second = await order_service.get_order(order_id)
+
+    assert first is second
+    order_repo.get_order.assert_awaited_once_with(id=order_id)
+
+
+@pytest.mark.asyncio
+async def test_service_patch_publishes_invalidation(order_service, fake_rdb, order_repo, order_model_patch, order_update_data, order_id):
+    """Patching an order tells the other workers to drop their L1 copy."""
+    order_repo.update_order.return_value = order_model_patch
+    pubsub = fake_rdb.pubsub()
+    await pubsub.subscribe(ORDER_INVALIDATION_CHANNEL)
+    await pubsub.get_message(timeout=1)
+
+    await order_service.patch_order(order_id, order_update_data)
+    await run_after_commit(order_repo.session)
+
+    message = await pubsub.get_message(timeout=1)
+    assert message["data"].endswith(str(order_id))
+    await pubsub.reset()
+
+
+@pytest.mark.asyncio
+async def test_service_get_order_single_flight(order_service, fake_rdb, order_repo, order_model, order_id):
+    """Concurrent misses of one key are served by a single DB fetch."""
+    async def slow_get_order(id):
+        await asyncio.sleep(0.05)
+        return order_model
+    order_repo.get_order.side_effect = slow_get_order
+
+    results = await asyncio.gather(*[order_service.get_order(order_id) for _ in range(10)])
+
+    assert {result.id for result in results} == {order_id}
+    order_repo.get_order.assert_awaited_once_with(id=order_id)
+
+
+@pytest.mark.asyncio
+async def test_service_fill_uses_its_own_session(mocker, fake_rdb, order_repo, outbox_repo, order_model, order_id):
+    """The shared fill does not borrow the session of the request that started it."""
+    fill_session = MagicMock()
+    repository = mocker.patch("app.services.order_service.OrderRepository")
+    repository.return_value.get_order = AsyncMock(return_value=order_model)
+    service = OrderService(order_repo, outbox_repo, fill_sessions=lambda: nullcontext(fill_session))
+
+    assert (await service.get_order(order_id)).id == order_id
+
+    repository.assert_called_once_with(fill_session)
+    order_repo.get_order.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_service_get_order_waits_for_other_worker_fill(mocker, order_service, fake_rdb, order_repo, order_model, order_id):
+    """With the fill lock held elsewhere, the value filled by that worker is used."""
+    mocker.patch("app.services.order_service.settings.order_cache_lock_ms", 1000)
+    await fake_rdb.set(f"lock:order:{order_id}", "other")
+
+    async def other_worker_fill():
+        await asyncio.sleep(0.05)
+        await fake_rdb.set(f"order:{order_id}", order_model.model_dump_json())
+
+    result, _ = await asyncio.gather(order_service.get_order(order_id), other_worker_fill())
+
+    assert result.id == order_id
+    order_repo.get_order.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_service_get_order_releases_own_lock_only(mocker, order_service, fake_rdb, order_repo, order_model, order_id):
+    """The fill lock is released with a compare-and-delete on this worker's token."""
+    mocker.patch("app.services.order_service.settings.order_cache_lock_ms", 1000)
+    release = mocker.patch.object(fake_rdb, "eval", AsyncMock(return_value=1))
+    order_repo.get_order.return_value = order_model
+
+    await order_service.get_order(order_id)
+
+    release.assert_awaited_once_with(RELEASE_LOCK_SCRIPT, 1, f"lock:order:{order_id}", _worker_token)
+
+
+@pytest.mark.asyncio
+async def test_service_replica_reads_fill_cache(mocker, order_service, fake_rdb, order_repo, order_model, order_id, mock_order_user, user_id):
+    """Replica reads warm the caches like primary reads do."""
+    order_repo.session.info["replica"] = True
+    order_repo.get_order.return_value = order_model
+    order_repo.get_order_user.return_value = mock_order_user
+
+    await order_service.get_order(order_id)
+    await order_service.get_order_user(user_id)
+    order_l1.clear()
+    await order_service.get_order(order_id)
+    await order_service.get_order_user(user_id)
+
+    order_repo.get_order.assert_awaited_once()
+    order_repo.get_order_user.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_service_replica_reads_skip_cache_after_write(mocker, order_service, fake_rdb, order_repo, order_model, order_id, mock_order_user, user_id):
+    """Within the replica lag window after a write, replica rows may be stale and are not cached."""
+    mocker.patch("app.services.order_service.settings.database_replica_urls", "postgresql+asyncpg://replica/db")
+    order_repo.session.info["replica"] = True
+    order_repo.get_order.return_value = order_model
+    order_repo.get_order_user.return_value = mock_order_user
+    await invalidate_order(order_id, user_id)
+
+    await order_service.get_order(order_id)
+    await order_service.get_order_user(user_id)
+
+    assert order_l1.get(order_id) is None
+    assert await fake_rdb.keys("order*") == [f"orders:user:{user_id}:ver"]
+
+
+@pytest.mark.asyncio
+async def test_service_get_order_early_refresh(mocker, order_service, fake_rdb, order_repo, order_model, order_id):
+    """A hit close to expiry refreshes the entry from the DB."""
+    mocker.patch("app.services.order_service.should_refresh_early", return_value=True)
+    await fake_rdb.set(f"order:{order_id}", order_model.model_dump_json(), ex=1)
+    order_repo.get_order.return_value = order_model
+
+    await order_service.get_order(order_id)
+
+    order_repo.get_order.assert_awaited_once_with(id=order_id)
+    assert await fake_rdb.ttl(f"order:{order_id}") > 1
+
+
+def test_cache_codecs_round_trip(order_model):
+    pytest.importorskip("msgpack")
+    page = OrderPage(items=[order_model], next_cursor="abc")
+    for name in ("json", "msgpack"):
+        codec = make_codec(name, OrderResponse)
+        assert codec.loads(codec.dumps(order_model)) == order_model
+        page_codec = make_codec(name, OrderPage)
+        assert page_codec.loads(page_codec.dumps(page)) == page
+
+    assert len(MsgpackCodec(OrderResponse).dumps(order_model)) < len(JsonCodec(OrderResponse).dumps(order_model))
+    with pytest.raises(ValueError):
+        make_codec("pickle", OrderResponse)
+
+
+@pytest.mark.asyncio
+async def test_service_get_order_undecodable_cache_is_miss(order_service, fake_cache_rdb, order_repo, order_model, order_id):
+    await fake_cache_rdb.set(f"order:{order_id}", b"\x92garbage")
+    order_repo.get_order.return_value = order_model
+
+    result = await order_service.get_order(order_id)
+
+    assert result.id == order_id
+    order_repo.get_order.assert_awaited_once_with(id=order_id)
+
+
+def test_should_refresh_early():
+    assert not should_refresh_early(ttl_left=-1, delta=10, beta=1)
+    assert not should_refresh_early(ttl_left=1, delta=10, beta=0)
+    assert not should_refresh_early(ttl_left=300, delta=0.001, beta=1)
+    assert should_refresh_early(ttl_left=0, delta=0.001, beta=1)
+
+
+def test_invalidation_from_other_worker_evicts_l1(order_model, order_id):
+    order_l1.set(order_id, order_model)
+    handle_order_invalidation(f"{_worker_token}:{order_id}")
+    assert order_l1.get(order_id) is order_model
+
+    handle_order_invalidation(f"other:{order_id}")
+    assert order_l1.get(order_id) is None
+
+
+@pytest.mark.asyncio
+async def test_get_order_user_page_cached_until_write(order_service, fake_rdb, order_repo, order_create_data, mock_order_user, order_model, user_id):
+    """User pages come from cache until a committed write bumps the user's version."""
+    order_repo.get_order_user.return_value = mock_order_user
+    order_repo.create_order.return_value = order_model
+
+    first = await order_service.get_order_user(user_id)
+    second = await order_service.get_order_user(user_id)
+    assert first == second
+    order_repo.get_order_user.assert_awaited_once()
+
+    await order_service.create_order(data=order_create_data, user_id=user_id)
+    await order_service.get_order_user(user_id)
+    assert order_repo.get_order_user.await_count == 1
+
+    await run_after_commit(order_repo.session)
+    await order_service.get_order_user(user_id)
+    assert order_repo.get_order_user.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_orders_multi(order_service, fake_rdb, order_repo, order_model, order_id):
+    """Cached ids come from one MGET, the rest from one DB query; order is kept."""
+    cached = order_model.model_copy(update={"id": uuid.uuid4()})
+    await fake_rdb.set(f"order:{cached.id}", cached.model_dump_json())
+    order_repo.get_orders.return_value = [order_model]
+    missing = uuid.uuid4()
+
+    result = await order_service.get_orders([missing, order_id, cached.id])
+
+    assert [item.id for item in result] == [missing, order_id, cached.id]
+    assert [item.found for item in result] == [False, True, True]
+    order_repo.get_orders.assert_awaited_once_with([missing, order_id])
+    assert await fake_rdb.exists(f"order:{order_id}")
+
+
+@pytest.mark.asyncio
+async def test_get_orders_multi_too_many(mocker, order_service):
+    mocker.patch("app.services.order_service.settings.orders_multi_get_max", 1)
+
+    with pytest.raises(HTTPException) as exc:
+        await order_service.get_orders([uuid.uuid4(), uuid.uuid4()])
+
+    assert exc.value.status_code == 422
+
+
 # auth
 
 @pytest.mark.asyncio
@@ -145,3 +1017,93 @@ async def test_auth_wrong_password(auth_service_wrong_password, mock_user_repo_w
 
     assert exc.value.status_code == 401
     assert "Incorrect email or password" in exc.value.detail
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached(user_cache, jwt_service, mock_user_repo_success, access_token):
+    mock_user_repo_success.get_by_id.return_value = mock_user_repo_success.get_by_email.return_value
+
+    first = await get_current_user(access_token, mock_user_repo_success, jwt_service)
+    second = await get_current_user(access_token, mock_user_repo_success, jwt_service)
+
+    assert first == second == UserContext(user_id=1, email="user@test.com")
+    mock_user_repo_success.get_by_id.assert_awaited_once_with(1)
+
+
+@pytest.mark.asyncio
+async def test_current_user_invalidated(user_cache, jwt_service, mock_user_repo_none, access_token):
+    await user_cache.set(UserContext(user_id=1, email="user@test.com"))
+    await user_cache.invalidate(1)
+    mock_user_repo_none.get_by_id.return_value = None
+
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(access_token, mock_user_repo_none, jwt_service)
+
+    assert exc.value.status_code == 401
+
+
+def test_ttl_cache_evicts_lru_and_expired(mocker):
+    clock = mocker.patch("app.services.cache.time.monotonic", return_value=0)
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    clock.return_value = 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 2}
+
+
+def test_verified_token_cache(mocker, jwt_service, access_token):
+    mocker.patch("app.services.jwt_services.token_cache", TTLCache(maxsize=10, ttl=0))
+    decode = mocker.spy(jwt, "decode")
+
+    first = jwt_service.verify_token(access_token, TokenType.ACCESS)
+    second = jwt_service.verify_token(access_token, TokenType.ACCESS)
+
+    assert first == second
+    decode.assert_called_once()
+    assert jwt_services.token_cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_verified_token_cache_rejects_expired(jwt_service):
+    token = jwt_service._create_token(1, TokenType.ACCESS, expires_delta=timedelta(seconds=-1))
+
+    with pytest.raises(HTTPException) as exc:
+        jwt_service.verify_token(token, TokenType.ACCESS)
+
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_auth_busy_when_hasher_saturated(mocker, auth_service_success, mock_user_repo_success, login_request):
+    mocker.patch.object(
+        auth_service_success.jwt_service, "verify_password_async", side_effect=ExecutorSaturatedError
+    )
+
+    with patch("app.services.auth_service.UserRepository") as mocked_class:
+        mocked_class.return_value = mock_user_repo_success
+        with pytest.raises(HTTPException) as exc:
+            await auth_service_success.token(login_request, db=None)
+
+    assert exc.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_bounded_executor_rejects_when_full():
+    executor = BoundedExecutor(max_workers=1, max_queue=1, name="test")
+    release = threading.Event()
+    running = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+
+    assert executor.stats()["queued"] == 1
+    with pytest.raises(ExecutorSaturatedError):
+        await executor.run(release.wait)
+
+    release.set()
+    await asyncio.gather(*running)
+    assert executor.stats() == {"workers": 1, "running": 0, "queued": 0, "completed": 2, "rejected": 1}